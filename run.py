@@ -5,6 +5,11 @@ from pprint import pprint
 # 1. 환경 변수 로드
 load_dotenv()
 
+# [추가] 카세트 replay 모드에서는 외부 API를 호출하지 않으므로, 키가 없으면 더미 값을 사용합니다.
+if os.getenv("CASSETTE_MODE") == "replay":
+    os.environ.setdefault("OPENAI_API_KEY", "sk-replay")
+    os.environ.setdefault("SERPAPI_API_KEY", "replay")
+
 # 2. API 키 존재 여부 확인 (가독성/안정성)
 if not os.getenv("OPENAI_API_KEY"):
     raise EnvironmentError("환경 변수 'OPENAI_API_KEY'가 설정되지 않았습니다. .env 파일을 확인하세요.")
@@ -17,6 +22,7 @@ if not os.getenv("SERPAPI_API_KEY"):
 #    (API 키가 로드된 *후에* 임포트해야 안전합니다.)
 from src.bitcoin_agent.graph import app
 from src.bitcoin_agent.state import AgentState
+from src.bitcoin_agent.cassette import cassette_from_settings
 
 def main():
     """
@@ -90,4 +96,6 @@ def main():
 if __name__ == "__main__":
     # [수정] 주석에 있는 설치 예시도 최신화합니다. (Tavily -> google-search-results)
     # pip install python-dotenv langchain langgraph langchain-openai google-search-results yfinance pandas pandas-ta
-    main()
\ No newline at end of file
+    # [추가] CASSETTE_MODE가 설정되어 있으면 외부 I/O를 카세트로 기록/재생합니다.
+    with cassette_from_settings():
+        main()
\ No newline at end of file
@@ -4,6 +4,10 @@ from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
 import json
 
 from ..state import AgentState
+from .. import settings
+from ..prompt_encoding import (
+    PromptBuilder, render_indicators, render_table, build_revision_request, apply_section_edits,
+)
 
 # planner와 동일한 모델을 사용하거나, 분석/작문에 더 특화된 모델(예: gpt-4-turbo)을 사용할 수 있습니다.
 MODEL_NAME = "gpt-4o" 
@@ -25,16 +29,21 @@ def create_analysis_agent():
     """
     
     # 1. LLM 초기화 (도구 바인딩이 필요 없음)
-    llm = ChatOpenAI(model=MODEL_NAME, temperature=0.2) # 일관된 분석을 위해 temperature 낮춤
+    # [수정] 파이프라인 모드는 이 체인을 스트리밍하므로, 스트림 응답에도 usage(프롬프트/캐시 토큰)가 포함되도록 요청합니다.
+    #        (base_url을 지정하면 ChatOpenAI가 stream_usage를 기본으로 켜지 않습니다.)
+    llm = ChatOpenAI(model=MODEL_NAME, base_url=settings.OPENAI_BASE_URL, temperature=0.2, stream_usage=True) # 일관된 분석을 위해 temperature 낮춤
     
     # 2. 프롬프트 템플릿 설정
     system_prompt = get_analysis_prompt()
     
     # 이 Agent는 'messages' 히스토리를 전부 참조하기보다,
     # 'input_data'로 정제된 데이터만 받아서 작업하는 것이 더 효율적입니다.
+    # [수정] Provider 측 prefix 캐시가 적중하도록, 라운드마다 변하지 않는 부분(시스템 프롬프트 + 시장 스냅샷)을
+    #        앞에 두고, 라운드마다 바뀌는 부분(기존 초안/수정 지시/작업 지시)은 마지막 메시지로 분리합니다.
     prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt), # 'analysis.md'의 내용
-        ("human", "{input_data}")  # Python 코드에서 동적으로 생성할 입력 데이터
+        SystemMessage(content=system_prompt), # 'analysis.md'의 내용 (템플릿 변수 없이 고정)
+        ("human", "{snapshot}"), # 시장 스냅샷 (기술적 분석 + 시장 정서)
+        ("human", "{task}")      # 휘발성: 수정 지시 / 기존 초안 / 작업 지시
     ])
     
     # 3. LLM 체인(Runnable) 생성
@@ -46,50 +55,122 @@ def create_analysis_agent():
 analysis_chain = create_analysis_agent()
 
 
-def format_data_for_llm(state: AgentState) -> str:
+def format_sentiment_summary(sentiment_data) -> str:
+    """
+    정서 요약(dict)을 몇 줄의 텍스트로 포맷팅합니다.
+    (요약 형식이 아닌 경우에는 기존처럼 json.dumps로 출력합니다.)
+    """
+    if not (isinstance(sentiment_data, dict) and "top_headlines" in sentiment_data):
+        return json.dumps(sentiment_data, indent=2, ensure_ascii=False)
+
+    lines = [
+        f"종합 정서 점수: {sentiment_data['score']:+.2f} ({sentiment_data['label']}, 범위 -1 ~ +1)",
+        f"기사 {sentiment_data['article_count']}건 -> 중복 제거 후 {sentiment_data['unique_count']}건 "
+        f"(긍정 {sentiment_data['positive']} / 부정 {sentiment_data['negative']} / 중립 {sentiment_data['neutral']})",
+        "대표 헤드라인:",
+    ]
+    for headline in sentiment_data["top_headlines"]:
+        lines.append(f"- [{headline['score']:+.2f}] {headline['title']} (보도 {headline['duplicates']}건)")
+    return "\n".join(lines)
+
+
+def build_analysis_input(state: AgentState, full_draft: bool = False) -> dict:
     """
-    LLM이 분석하기 좋도록 AgentState의 데이터를 문자열로 포맷팅합니다.
+    LLM이 분석하기 좋도록 AgentState의 데이터를 간결한 프롬프트로 인코딩합니다.
     (Req 1: 코드 가독성, Req 4: 상세 설명)
+
+    [수정] json.dumps(indent=2) 대신 prompt_encoding의 key=value / 표 형식과 섹션별 토큰 예산을 사용합니다.
+
+    Args:
+        full_draft (bool): True면 섹션 단위 수정 요청을 만들지 않고 항상 초안 전체를 보냅니다.
+                           (섹션 단위 응답을 해석하지 못했을 때의 재요청용)
+
+    Returns:
+        dict: {'snapshot': 라운드 간 고정되는 시장 스냅샷, 'task': 라운드마다 바뀌는 작업 지시,
+               'input_data': 두 부분을 합친 전체 텍스트, 'token_report': 섹션별 토큰 수,
+               'revision_sections': 섹션 단위 수정 요청을 보냈다면 원본 섹션 리스트 (아니면 None)}
     """
-    input_parts = []
+    builder = PromptBuilder()
+    revision_sections = None
     
     # 1. 기술적 분석 데이터
     tech_data = state.get('technical_analysis')
     if tech_data:
-        input_parts.append("[기술적 분석 데이터]\n" + json.dumps(tech_data, indent=2, ensure_ascii=False))
+        builder.add("technical", "[기술적 분석 데이터]", render_indicators(tech_data))
     else:
         # --- [핵심 수정] ---
         # 기술적 분석이 실패했어도, 원본 시장 데이터가 있으면 대신 사용
         market_data = state.get('market_data')
         if market_data:
-            input_parts.append("[기술적 분석 데이터]\n(계산 실패. 원본 시장 데이터(일부)로 대체)")
             # 데이터가 너무 길 수 있으므로 최신 5개만 요약
             recent_data = market_data.get('data', [])[-5:]
-            input_parts.append(json.dumps(recent_data, indent=2, ensure_ascii=False))
+            builder.add("market", "[기술적 분석 데이터]\n(계산 실패. 원본 시장 데이터(일부)로 대체)",
+                        render_table(recent_data, ["Date", "Open", "High", "Low", "Close", "Volume"]))
         else:
-            input_parts.append("[기술적 분석 데이터]\n데이터 없음")
+            builder.add("technical", "[기술적 분석 데이터]", "데이터 없음")
         # --- [수정 끝] ---
         
     # 2. 시장 정서 및 뉴스 데이터
     sentiment_data = state.get('sentiment_analysis')
     if sentiment_data:
-        # (sentiment_analysis가 복잡한 dict/list일 경우를 대비해 json.dumps 사용)
-        input_parts.append("\n[시장 정서 및 뉴스 데이터]\n" + json.dumps(sentiment_data, indent=2, ensure_ascii=False))
+        # [수정] planner가 news_processing.summarize_news()로 집계한 요약을 간결하게 렌더링
+        builder.add("sentiment", "[시장 정서 및 뉴스 데이터]", format_sentiment_summary(sentiment_data))
     else:
-        input_parts.append("\n[시장 정서 및 뉴스 데이터]\n데이터 없음")
+        builder.add("sentiment", "[시장 정서 및 뉴스 데이터]", "데이터 없음")
 
     # 3. 비평(Reflection) 데이터 (수정 작업 시)
     reflection = state.get('reflection')
     if reflection:
-        draft = state.get('draft_analysis', '이전 초안 없음')
-        input_parts.append(f"\n\n--- [기존 초안] ---\n{draft}")
-        input_parts.append(f"\n\n--- [수정 지시] ---\n{reflection}")
-        input_parts.append("\n\n[지시] 위 [수정 지시]를 반영하여 [기존 초안]을 개선한 새로운 초안을 작성하십시오.")
+        draft = state.get('draft_analysis') or '이전 초안 없음'
+        # [추가] 가능하면 초안 전체 대신, 비평과 관련된 섹션만 보내는 섹션 단위 수정 요청을 만듭니다.
+        revision = None if full_draft else build_revision_request(draft, reflection)
+        builder.add("reflection", "--- [수정 지시] ---", reflection)
+        if revision:
+            revision_text, revision_sections = revision
+            builder.add("draft", "--- [기존 초안 (섹션 단위)] ---", revision_text)
+            builder.add("instruction", "", "[지시] 위 [수정 지시]를 반영하여 수정이 필요한 섹션만 다시 작성하십시오. "
+                        "각 섹션은 '[S번호]' 한 줄 뒤에 새 본문을 쓰고, 변경하지 않는 섹션은 출력하지 마십시오.")
+        else:
+            # (모델이 받는 유일한 초안 사본이므로, 예산으로 뒷부분을 자르지 않습니다.)
+            builder.add("draft", "--- [기존 초안] ---", draft, enforce_budget=False)
+            builder.add("instruction", "", "[지시] 위 [수정 지시]를 반영하여 [기존 초안]을 개선한 새로운 초안을 작성하십시오.")
     else:
         # 첫 작성 작업 시
-        input_parts.append("\n\n[지시] 위 데이터를 바탕으로 비트코인 트렌드 분석 초안을 작성하십시오.")
+        if state.get('tickers'):
+            # (비교 분석 모드) 기술적 분석 데이터는 티커별로 묶여 있습니다.
+            targets = ", ".join(state['tickers'])
+            builder.add("instruction", "", f"[지시] 위 데이터를 바탕으로 {targets}의 추세를 비교하는 분석 초안을 작성하십시오.")
+        else:
+            builder.add("instruction", "", "[지시] 위 데이터를 바탕으로 비트코인 트렌드 분석 초안을 작성하십시오.")
         
-    return "\n".join(input_parts)
+    snapshot = builder.render(["technical", "market", "sentiment"])
+    task = builder.render(["reflection", "draft", "instruction"])
+    return {
+        "snapshot": snapshot,
+        "task": task,
+        "input_data": f"{snapshot}\n\n{task}",
+        "token_report": builder.token_report,
+        "revision_sections": revision_sections,
+    }
+
+
+def request_full_revision(state: AgentState):
+    """
+    초안 전체를 보내는 수정 요청으로 analysis_chain을 다시 호출합니다.
+    섹션 단위 수정 응답에서 '[S번호]' 표시를 찾지 못했을 때, 변경된 섹션만 담긴 응답으로
+    초안 전체를 덮어쓰지 않기 위해 사용합니다.
+
+    Returns:
+        (build_analysis_input 결과, LLM 응답)
+    """
+    encoded = build_analysis_input(state, full_draft=True)
+    response: AIMessage = analysis_chain.invoke({"snapshot": encoded["snapshot"], "task": encoded["task"]})
+    return encoded, response
+
+
+def format_data_for_llm(state: AgentState) -> str:
+    """build_analysis_input()의 프롬프트 텍스트만 반환합니다. (기존 호출부 호환용)"""
+    return build_analysis_input(state)["input_data"]
 
 
 # [핵심] LangGraph의 노드(Node) 함수
@@ -100,18 +181,29 @@ def analysis_agent(state: AgentState) -> dict:
     """
     
     # 1. LLM에게 전달할 입력 데이터 포맷팅
-    input_data = format_data_for_llm(state)
+    encoded = build_analysis_input(state)
     
     # 2. LLM 체인 호출
     #    (이 LLM은 오직 분석 텍스트만 반환하도록 프롬프트됨)
-    response: AIMessage = analysis_chain.invoke({"input_data": input_data})
+    response: AIMessage = analysis_chain.invoke({"snapshot": encoded["snapshot"], "task": encoded["task"]})
+    
+    # [추가] 섹션 단위 수정 요청이었다면, 응답의 수정 섹션을 기존 초안에 반영합니다.
+    #        (응답에서 '[S번호]' 표시를 찾지 못하면, 초안 전체 수정 요청으로 한 번 더 요청합니다.)
+    draft = response.content
+    if encoded["revision_sections"]:
+        draft = apply_section_edits(encoded["revision_sections"], response.content)
+        if draft is None:
+            encoded, response = request_full_revision(state)
+            draft = response.content
+    input_data = encoded["input_data"]
     
     # 3. State 업데이트
     #    LLM이 생성한 텍스트(response.content)를 'draft_analysis' 키에 저장합니다.
     #    이 'draft_analysis'는 'reflection_node'로 전달될 것입니다.
     #    'messages'에도 이력을 추가합니다.
     return {
-        "draft_analysis": response.content,
+        "draft_analysis": draft,
+        "analysis_prompt_tokens": encoded["token_report"],
         "messages": [
             HumanMessage(content=f"[Analysis Node] 다음 데이터를 기반으로 분석을 수행합니다:\n{input_data}"), # (디버깅/로깅용)
             response # LLM의 응답 (분석 초안)
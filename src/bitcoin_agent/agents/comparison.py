@@ -0,0 +1,90 @@
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from typing import Dict, Any
+
+from ..state import AgentState
+from .. import settings
+from ..intent import extract_tickers
+from ..tools.market_data import get_ohlcv_data
+from ..tools.technical_analysis import calculate_technical_indicators
+from ..tools.search import google_search
+from ..tools.news_processing import summarize_news
+
+# [비교 분석 모드]
+# "BTC vs ETH vs SOL 추세 비교" 같은 다중 티커 질문은 planner가 티커마다 도구를 순차 호출하는 대신,
+# graph.py의 'entry_router'가 LangGraph의 Send API로 아래 워커 노드들을 *병렬* 실행(fan-out)합니다.
+# 각 워커의 간결한 결과는 'comparison_merge'에서 하나의 State로 합쳐진 뒤,
+# 단 한 번의 analysis -> reflection 사이클로 넘어갑니다. (LLM 호출 없음)
+
+
+def _summarize_price(ohlcv: Dict[str, Any]) -> Dict[str, Any]:
+    """OHLCV 원본 데이터를 기간 변화율/고가/저가로 압축합니다."""
+    rows = ohlcv.get("data") or []
+    if not rows:
+        return {}
+    first_close, last_close = rows[0]["Close"], rows[-1]["Close"]
+    return {
+        "change_pct": round((last_close - first_close) / first_close * 100, 2) if first_close else None,
+        "high": max(row["High"] for row in rows),
+        "low": min(row["Low"] for row in rows),
+    }
+
+
+# [핵심] Send API로 티커마다 하나씩 실행되는 워커 노드
+def ticker_worker(payload: Dict[str, Any]) -> dict:
+    """
+    하나의 티커에 대해 가격 데이터와 기술적 지표를 수집하여 간결한 결과로 반환합니다.
+    (payload는 AgentState 전체가 아니라 Send로 전달된 {'ticker': ...} 입니다.)
+    """
+    ticker = payload["ticker"]
+    result: Dict[str, Any] = {"ticker": ticker}
+
+    # 지표 계산(1y)과 가격 요약(30d)은 서로 독립적인 yfinance 호출이므로 동시에 실행합니다.
+    # (순차 실행하면 티커당 데이터 수집 시간이 두 배가 됩니다.)
+    with ContextThreadPoolExecutor(max_workers=2) as executor:
+        indicators_future = executor.submit(calculate_technical_indicators.invoke, {
+            "ticker": ticker,
+            "period": settings.DEFAULT_MARKET_DATA_PERIOD,
+        })
+        ohlcv_future = executor.submit(get_ohlcv_data.invoke, {"ticker": ticker, "period": settings.COMPARISON_PRICE_PERIOD})
+        indicators, ohlcv = indicators_future.result(), ohlcv_future.result()
+
+    if "error" in indicators:
+        result["error"] = indicators["error"]
+        return {"comparative_results": [result]}
+    result.update(indicators)
+
+    if "error" not in ohlcv:
+        result.update({f"{k}_{settings.COMPARISON_PRICE_PERIOD}": v for k, v in _summarize_price(ohlcv).items()})
+
+    # 'comparative_results'는 operator.add 리듀서로 누적되므로, 병렬 워커의 결과가 모두 합쳐집니다.
+    return {"comparative_results": [result]}
+
+
+def news_worker(payload: Dict[str, Any]) -> dict:
+    """비교 대상 티커들에 대한 뉴스를 한 번에 검색하여 정서 요약을 반환합니다. (티커 워커와 병렬 실행)"""
+    names = " ".join(ticker.split("-")[0] for ticker in payload["tickers"])
+    results = google_search.invoke({"query": f"{names} 최신 뉴스 및 시장 정서"})
+
+    if results and not (isinstance(results[0], dict) and "error" in results[0]):
+        return {"sentiment_analysis": summarize_news(results)}
+    return {}
+
+
+def comparison_merge(state: AgentState) -> dict:
+    """
+    병렬 워커들의 결과를 티커별 dict로 합쳐 'technical_analysis'에 저장합니다.
+    이후 흐름은 단일 티커와 동일하게 analysis -> reflection -> planner 순서로 진행됩니다.
+    """
+    merged = {}
+    for result in state.get("comparative_results") or []:
+        result = dict(result)
+        merged[result.pop("ticker")] = result
+
+    # 질문에 등장한 순서를 유지합니다.
+    tickers = [ticker for ticker in extract_tickers(state["query"]) if ticker in merged]
+    return {
+        "tickers": tickers,
+        "technical_analysis": {ticker: merged[ticker] for ticker in tickers},
+        "messages": [HumanMessage(content=f"비교 분석을 시작합니다. 사용자 질문: {state['query']} (대상: {', '.join(tickers)})")],
+    }
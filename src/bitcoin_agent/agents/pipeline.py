@@ -0,0 +1,118 @@
+import hashlib
+from typing import Dict, List
+from concurrent.futures import Future
+
+from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+
+from ..state import AgentState
+from .. import settings
+from ..prompt_encoding import split_sections, apply_section_edits
+from . import analysis, reflection
+
+# [파이프라인(투기적) 비평 모드]
+# 기본 그래프는 analysis(초안 전체) -> reflection(비평 전체) -> planner 순으로 직렬 실행됩니다.
+# 이 노드는 analysis_chain의 출력을 스트리밍으로 받으면서, 완성된 섹션부터 바로 섹션 단위 비평을
+# 스레드 풀에 넘깁니다. 초안이 끝나면 남은 섹션만 비평하고 결과를 하나의 'reflection'으로 병합하므로,
+# 한 라운드의 소요 시간이 (초안 + 비평)의 합이 아니라 대략 둘 중 긴 쪽에 가까워집니다.
+# (settings.PIPELINED_REFLECTION = True일 때 graph.py가 'analysis' 노드로 이 함수를 사용합니다.)
+
+APPROVAL_MESSAGE = "매우 훌륭함. 이대로 최종 보고서로 승인해도 좋음."
+
+
+def _section_key(section: str) -> str:
+    """섹션 비평 캐시 키 (섹션 본문의 해시)"""
+    return hashlib.blake2b(section.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def merge_critiques(sections: List[str], critiques: Dict[str, str]) -> Dict:
+    """
+    섹션별 비평을 하나의 비평으로 병합합니다.
+
+    Returns:
+        dict: {'reflection': 병합된 비평 텍스트, 'blocking': 수정이 필요한 섹션이 하나라도 있는지}
+    """
+    blocking = []
+    for i, section in enumerate(sections):
+        critique = critiques[_section_key(section)]
+        if reflection.is_blocking_critique(critique):
+            # (섹션 제목을 함께 적어 두면, 다음 수정 라운드에서 select_target_sections()가 해당 섹션을 고를 수 있습니다.)
+            # (빈 초안처럼 줄이 없는 섹션도 있으므로 첫 줄이 없으면 빈 제목으로 둡니다.)
+            heading = (section.splitlines() or [""])[0].lstrip("#").strip()
+            blocking.append(f"[S{i + 1}] '{heading}' 섹션\n{critique.strip()}")
+
+    if not blocking:
+        return {"reflection": APPROVAL_MESSAGE, "blocking": False}
+    return {"reflection": "\n\n".join(blocking), "blocking": True}
+
+
+# [핵심] LangGraph의 노드(Node) 함수
+def pipelined_analysis_agent(state: AgentState) -> dict:
+    """
+    'analysis' 노드의 파이프라인 버전입니다.
+    초안(draft_analysis)을 스트리밍으로 생성하면서 섹션 단위 비평을 겹쳐 실행하고,
+    병합된 비평(reflection)과 차단 여부(reflection_blocking)까지 한 번에 State에 기록합니다.
+    """
+    encoded = analysis.build_analysis_input(state)
+    revision_sections = encoded["revision_sections"]
+
+    # 이전 라운드에서 이미 비평한 섹션(본문이 동일한 섹션)은 다시 비평하지 않습니다.
+    cached: Dict[str, str] = dict(state.get('section_critiques') or {})
+    futures: Dict[str, Future] = {}
+
+    executor = ContextThreadPoolExecutor(max_workers=settings.PIPELINED_REFLECTION_WORKERS)
+
+    def submit(section: str):
+        key = _section_key(section)
+        if key not in cached and key not in futures:
+            futures[key] = executor.submit(reflection.critique_section, section)
+
+    try:
+        # 1. 초안 스트리밍 + 완성된 섹션의 투기적 비평
+        #    (마지막 섹션은 아직 작성 중일 수 있으므로 제외합니다.
+        #     섹션 단위 수정 응답('[S번호]' 형식)은 초안 본문이 아니므로 스트리밍 중에는 비평하지 않습니다.)
+        buffer = ""
+        for chunk in analysis.analysis_chain.stream({"snapshot": encoded["snapshot"], "task": encoded["task"]}):
+            buffer += chunk.content or ""
+            if revision_sections is None:
+                for section in split_sections(buffer)[:-1]:
+                    submit(section)
+
+        # 2. 최종 초안 확정
+        #    (섹션 단위 응답에서 '[S번호]' 표시를 찾지 못하면, 초안 전체 수정 요청으로 한 번 더 요청합니다.)
+        draft = buffer
+        if revision_sections:
+            draft = apply_section_edits(revision_sections, buffer)
+            if draft is None:
+                encoded, response = analysis.request_full_revision(state)
+                draft = buffer = response.content
+
+        # 3. 아직 비평하지 않은 섹션을 마저 비평하고, 최종 초안에 있는 섹션의 결과만 기다립니다.
+        sections = split_sections(draft) or [draft]
+        for section in sections:
+            submit(section)
+        for section in sections:
+            key = _section_key(section)
+            if key not in cached:
+                cached[key] = futures[key].result()
+    finally:
+        # 스트리밍 도중 잘못 나뉜 섹션처럼 최종 초안에 없는 섹션의 비평은 기다리지 않고 버립니다.
+        # (아직 시작하지 않은 비평은 취소하고, 이미 실행 중인 비평은 백그라운드에서 끝나도록 둡니다.)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    critiques = {_section_key(section): cached[_section_key(section)] for section in sections}
+    merged = merge_critiques(sections, critiques)
+
+    return {
+        "draft_analysis": draft,
+        "analysis_prompt_tokens": encoded["token_report"],
+        "reflection": merged["reflection"],
+        "reflection_blocking": merged["blocking"],
+        "section_critiques": critiques,
+        "messages": [
+            HumanMessage(content=f"[Analysis Node] 다음 데이터를 기반으로 분석을 수행합니다:\n{encoded['input_data']}"),
+            AIMessage(content=buffer),
+            HumanMessage(content=f"[Reflection Node] 다음 초안에 대한 섹션 단위 비평을 수행했습니다:\n{draft}"),
+            AIMessage(content=merged["reflection"]),
+        ]
+    }
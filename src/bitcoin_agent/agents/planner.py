@@ -10,6 +10,7 @@ from .. import settings
 from ..tools.market_data import get_ohlcv_data
 from ..tools.technical_analysis import calculate_technical_indicators
 from ..tools.search import google_search
+from ..tools.news_processing import summarize_news
 
 MODEL_NAME = settings.PLANNER_MODEL
 
@@ -37,14 +38,22 @@ def generate_state_summary(state: AgentState) -> str:
     summary.append(f"- 뉴스/정서: {sentiment_status}")
         
     # 상세 데이터 (너무 길지 않게)
-    if state.get('technical_analysis'):
+    if state.get('tickers'):
+         # (비교 분석 모드) 티커별 RSI
+         for ticker in state['tickers']:
+             summary.append(f"  ({ticker} 최신 RSI: {state['technical_analysis'].get(ticker, {}).get('rsi_14')})")
+    elif state.get('technical_analysis'):
          summary.append(f"  (최신 RSI: {state['technical_analysis'].get('rsi_14')})")
+    if state.get('sentiment_analysis'):
+         sentiment = state['sentiment_analysis']
+         summary.append(f"  (정서 점수: {sentiment.get('score'):+.2f}, {sentiment.get('label')})")
 
     # 분석/비평 단계
     if state.get('draft_analysis') and not state.get('reflection'):
         summary.append("\n--- [최신 분석 초안] --- (비평 대기 중)")
     if state.get('reflection'):
-        summary.append(f"\n--- [최신 비평/피드백] ---\n{state['reflection']}")
+        # [수정] 비평 전문은 바로 앞의 '[비평/피드백 수신]' 메시지에 이미 있으므로, 같은 내용을 두 번 보내지 않고 상태만 적습니다.
+        summary.append("- 비평: 수신 완료 (위 [비평/피드백 수신] 메시지 참고)")
         
     return "\n".join(summary)
 # --- [추가 끝] ---
@@ -63,14 +72,18 @@ def create_planner_agent():
     
     # 2. LLM 초기화
     # [수정] .bind_functions(functions) 대신 .bind_tools(tools)를 사용합니다.
-    llm = ChatOpenAI(model=MODEL_NAME, temperature=0).bind_tools(tools)
+    llm = ChatOpenAI(model=MODEL_NAME, base_url=settings.OPENAI_BASE_URL, temperature=0).bind_tools(tools)
     
     # 3. 프롬프트 템플릿 설정
+    # [수정] Provider 측 prefix 캐시가 적중하도록, 프롬프트 앞부분을 매 호출 byte 단위로 동일하게 유지합니다.
+    #   (도구 스키마) -> 고정 시스템 프롬프트 -> 누적 대화 이력(append-only) -> [휘발성] 비평 수신/상태 요약
+    # 시스템 프롬프트는 템플릿 변수 없이 SystemMessage 그대로 넣어, 변하는 내용이 섞이지 않도록 합니다.
     system_prompt = get_planner_prompt()
     
     prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt), 
+        SystemMessage(content=system_prompt),
         MessagesPlaceholder(variable_name="messages"),
+        MessagesPlaceholder(variable_name="volatile"),
     ])
     
     planner_chain = prompt | llm
@@ -108,11 +121,16 @@ def planner_agent(state: AgentState) -> dict:
             # --- [수정 끝] ---
             
             if tool_name == "calculate_technical_indicators":
-                if isinstance(tool_content, dict) and "error" not in tool_content:
+                # (비교 분석 모드에서는 티커별로 병합된 결과를 단일 티커 결과로 덮어쓰지 않습니다.)
+                if isinstance(tool_content, dict) and "error" not in tool_content and not state.get('tickers'):
                     updates_to_state["technical_analysis"] = tool_content
             elif tool_name == "google_search":
+                # (비교 분석 모드에서 news_worker가 만든 다중 티커 정서 요약이 있으면, 단일 자산 검색 결과로 덮어쓰지 않습니다.)
+                if state.get('tickers') and state.get('sentiment_analysis'):
+                    continue
                 if isinstance(tool_content, list) and tool_content and not (isinstance(tool_content[0], dict) and "error" in tool_content[0]):
-                    updates_to_state["sentiment_analysis"] = tool_content
+                    # [추가] 원본 검색 결과 대신 중복 제거 + 정서 점수화된 요약을 저장합니다.
+                    updates_to_state["sentiment_analysis"] = summarize_news(tool_content)
             
             # --- [핵심 수정: 이 로직 추가] ---
             elif tool_name == "get_ohlcv_data":
@@ -122,7 +140,19 @@ def planner_agent(state: AgentState) -> dict:
     # --- [파싱 로직 끝] ---
 
     
+    # [추가] (파이프라인 비평 모드) 섹션 단위 비평에 차단 이슈가 없으면,
+    #        추가 비평 라운드나 LLM 호출 없이 현재 초안을 최종 보고서로 승인합니다.
+    #        (도구 실행 결과를 처리하는 중이면 평소처럼 LLM이 다음 단계를 결정합니다.)
+    if state.get('reflection_blocking') is False and state.get('draft_analysis') \
+            and not isinstance(state['messages'][-1], ToolMessage):
+        return {
+            "messages": [AIMessage(content="[Planner] 섹션 단위 비평에 차단 이슈가 없어 분석 초안을 최종 보고서로 승인합니다.")],
+            "final_report": state['draft_analysis'],
+        }
+
     messages = list(state['messages'])
+    new_messages = []
+    volatile = []
     
     if state.get('reflection'):
         reflection_message = HumanMessage(
@@ -131,25 +161,30 @@ def planner_agent(state: AgentState) -> dict:
                     "추가 도구가 필요하면 호출하고, 아니라면 도구 없이 응답하십시오."
                     "만약 최종 보고서를 작성할 단계라면, `final_report`를 생성하십시오."
         )
-        messages.append(reflection_message)
+        volatile.append(reflection_message)
     elif not state['messages']: 
-        messages.append(HumanMessage(content=f"분석을 시작합니다. 사용자 질문: {state['query']}"))
+        # [수정] 시작 메시지를 State 이력에도 저장하여, 다음 planner 호출의 prefix가 이번 호출과 동일하게 유지되도록 합니다.
+        start_message = HumanMessage(content=f"분석을 시작합니다. 사용자 질문: {state['query']}")
+        messages.append(start_message)
+        new_messages.append(start_message)
 
     
     # --- [LLM 호출 부분] ---
-    # 1. 현재 상태 요약본 생성
-    current_state_summary = generate_state_summary(state)
+    # 1. 현재 상태 요약본 생성 (업데이트될 데이터까지 반영)
+    #    [수정] 상태 요약은 매번 바뀌므로 시스템 프롬프트가 아닌, 프롬프트의 맨 마지막 메시지로 전달합니다.
+    current_state_summary = generate_state_summary({**state, **updates_to_state})
+    volatile.append(HumanMessage(content=f"[현재 Agent 상태]\n{current_state_summary}"))
 
-    # 2. LLM 호출 시 'messages'와 'state_summary'를 모두 전달
+    # 2. LLM 호출 시 'messages'(고정 prefix)와 'volatile'(휘발성 꼬리)을 분리하여 전달
     response: AIMessage = planner_chain.invoke({
         "messages": messages,
-        "state_summary": current_state_summary 
+        "volatile": volatile,
     })
     # --- [호출 끝] ---
     
     
     # 3. 반환값에 'messages'와 'state 업데이트'를 모두 포함
-    return_value = {"messages": [response]}
+    return_value = {"messages": new_messages + [response]}
     return_value.update(updates_to_state) 
 
     # 4. 'final_report' 생성 로직
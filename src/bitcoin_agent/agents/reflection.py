@@ -3,6 +3,7 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
 
 from ..state import AgentState
+from .. import settings
 
 # 비평은 더 고도화된 모델을 사용할 수도 있습니다. (예: gpt-4o)
 MODEL_NAME = "gpt-4o" 
@@ -24,13 +25,14 @@ def create_reflection_agent():
     """
     
     # 1. LLM 초기화 (도구 바인딩 필요 없음)
-    llm = ChatOpenAI(model=MODEL_NAME, temperature=0.1) # 비평의 일관성을 위해 temperature 낮춤
+    llm = ChatOpenAI(model=MODEL_NAME, base_url=settings.OPENAI_BASE_URL, temperature=0.1) # 비평의 일관성을 위해 temperature 낮춤
     
     # 2. 프롬프트 템플릿 설정
     system_prompt = get_reflection_prompt()
     
+    # [수정] 시스템 프롬프트는 템플릿 변수 없이 고정하여, 매 호출 byte 단위로 동일한 prefix를 유지합니다.
     prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt), # 'reflection.md'의 내용
+        SystemMessage(content=system_prompt), # 'reflection.md'의 내용
         ("human", "[분석 초안 전문]\n\n{draft_analysis}") # analysis_agent가 작성한 초안
     ])
     
@@ -43,6 +45,44 @@ def create_reflection_agent():
 reflection_chain = create_reflection_agent()
 
 
+# [추가] 섹션 단위 비평 (파이프라인 모드)
+# 초안이 스트리밍되는 동안 완성된 섹션부터 먼저 비평하기 위한 체인입니다.
+# 시스템 프롬프트(prefix)는 전체 비평 체인과 동일하게 유지하고, 섹션 검토 지시만 마지막 메시지에 붙입니다.
+SECTION_OK = "이상 없음"
+
+def create_section_reflection_agent():
+    """'reflection' Agent의 섹션 단위 비평 체인을 생성합니다."""
+    llm = ChatOpenAI(model=MODEL_NAME, base_url=settings.OPENAI_BASE_URL, temperature=0.1)
+    
+    prompt = ChatPromptTemplate.from_messages([
+        SystemMessage(content=get_reflection_prompt()),
+        ("human", "[분석 초안 중 한 섹션]\n\n{section}\n\n"
+                  f"(이 섹션만 검토하십시오. 수정이 꼭 필요한 문제가 없다면 \"{SECTION_OK}\"이라고만 응답하십시오.)")
+    ])
+    
+    return prompt | llm
+
+section_reflection_chain = create_section_reflection_agent()
+
+
+def is_blocking_critique(critique: str) -> bool:
+    """섹션 비평이 수정을 요구하는지 판단합니다. ('이상 없음' 또는 승인 문구면 차단 이슈 없음)"""
+    text = critique.strip()
+    return not (text.startswith(SECTION_OK) or text.startswith("매우 훌륭함"))
+
+
+def critique_section(section: str) -> str:
+    """
+    섹션 하나를 비평합니다. (파이프라인 모드에서 'analysis' 노드 안의 스레드 풀로 병렬 호출됨)
+    호출 위치와 무관하게 콜백(PrefixCacheTracker 등)에서 'reflection' 노드의 호출로 집계되도록 태그를 붙입니다.
+    """
+    response: AIMessage = section_reflection_chain.invoke(
+        {"section": section},
+        config={"run_name": "section_reflection", "metadata": {"langgraph_node": "reflection"}},
+    )
+    return response.content
+
+
 # [핵심] LangGraph의 노드(Node) 함수
 def reflection_agent(state: AgentState) -> dict:
     """
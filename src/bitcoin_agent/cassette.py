@@ -0,0 +1,335 @@
+import json
+import hashlib
+import threading
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterator
+
+import pandas as pd
+from langchain_openai import ChatOpenAI
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from . import settings
+
+# [Record / Replay 카세트]
+# 프롬프트나 그래프를 수정할 때마다 실제 OpenAI / SerpAPI / yfinance를 호출하면 몇 분씩 걸리고 비용이 듭니다.
+#   - record 모드: 도구와 체인이 만드는 모든 외부 응답(LLM 응답, GoogleSearch.get_dict() 결과, OHLCV DataFrame)을
+#                  버전이 매겨진 카세트(JSON) 파일에 기록합니다.
+#   - replay 모드: 기록된 응답을 결정적(deterministic)으로 즉시 돌려줍니다.
+#                  strict=True이면 기록에 없는 요청이 들어올 때 실제 호출 대신 CassetteMiss 예외를 발생시킵니다.
+#                  (도구들은 예외를 잡아 오류 payload로 바꾸므로, 미스는 카세트에도 기록해 두었다가
+#                   use_cassette 블록이 끝날 때 다시 CassetteMiss로 실패시킵니다.)
+#
+# 사용 예:
+#     with use_cassette("cassettes/btc_trend.json", mode="replay", strict=True):
+#         app.invoke({"query": "최근 비트코인 트렌드 분석해줘", "messages": []})
+
+CASSETTE_VERSION = 1
+
+
+class CassetteError(Exception):
+    """카세트 파일을 읽거나 쓸 수 없을 때 발생합니다. (버전 불일치 등)"""
+
+
+class CassetteMiss(CassetteError):
+    """strict replay 모드에서 기록에 없는 요청이 들어왔을 때 발생합니다."""
+
+
+def _request_key(kind: str, request: Dict[str, Any]) -> str:
+    canonical = json.dumps({"kind": kind, **request}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """
+    외부 I/O 요청/응답 쌍을 보관하는 카세트입니다.
+
+    같은 요청이 여러 번 기록된 경우(예: 동일 프롬프트로 반복 호출) 기록된 순서대로 응답하며,
+    기록된 응답을 모두 소진하면 마지막 응답을 반복해서 돌려줍니다.
+    """
+
+    def __init__(self, path, mode: str = "replay", strict: bool = False):
+        if mode not in ("record", "replay"):
+            raise CassetteError(f"알 수 없는 카세트 모드입니다: {mode} (record | replay)")
+        self.path = Path(path)
+        self.mode = mode
+        self.strict = strict
+        self.interactions: List[Dict[str, Any]] = []
+        self._queues: Dict[str, deque] = defaultdict(deque)
+        self._last: Dict[str, Any] = {}
+        self.misses: List[str] = [] # strict replay에서 기록에 없던 요청들 (블록 종료 시 CassetteMiss)
+        self._lock = threading.Lock()
+
+        if mode == "replay":
+            self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            raise CassetteError(f"카세트 파일을 찾을 수 없습니다: {self.path}")
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != CASSETTE_VERSION:
+            raise CassetteError(
+                f"카세트 버전이 맞지 않습니다: {data.get('version')} (필요: {CASSETTE_VERSION}). 다시 녹화하십시오."
+            )
+        self.interactions = data["interactions"]
+        for interaction in self.interactions:
+            self._queues[interaction["key"]].append(interaction["response"])
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": CASSETTE_VERSION,
+                "recorded_at": datetime.now().isoformat(timespec="seconds"),
+                "interactions": self.interactions,
+            }, f, ensure_ascii=False, indent=1)
+
+    def record(self, kind: str, request: Dict[str, Any], response: Any):
+        with self._lock:
+            self.interactions.append({
+                "kind": kind,
+                "key": _request_key(kind, request),
+                "request": request,
+                "response": response,
+            })
+
+    def lookup(self, kind: str, request: Dict[str, Any]) -> Optional[Any]:
+        """기록된 응답을 반환합니다. 없으면 None (strict 모드에서는 CassetteMiss)"""
+        key = _request_key(kind, request)
+        with self._lock:
+            if self._queues[key]:
+                self._last[key] = self._queues[key].popleft()
+            if key in self._last:
+                return self._last[key]
+        if self.strict:
+            message = f"카세트에 기록되지 않은 {kind} 요청입니다: {json.dumps(request, ensure_ascii=False, default=str)[:300]}"
+            with self._lock:
+                self.misses.append(message)
+            raise CassetteMiss(message)
+        return None
+
+    def raise_for_misses(self):
+        """
+        strict replay 중 기록에 없던 요청이 있었다면 CassetteMiss를 발생시킵니다.
+        (도구 내부의 `except Exception`에 삼켜진 미스도 여기서 드러납니다.)
+        """
+        if self.misses:
+            raise CassetteMiss(f"기록에 없는 요청 {len(self.misses)}건:\n" + "\n".join(self.misses))
+
+    def call(self, kind: str, request: Dict[str, Any], real_call, serialize, deserialize):
+        """
+        record 모드: 실제 호출 후 응답을 기록합니다.
+        replay 모드: 기록된 응답을 돌려주고, 기록이 없으면 (strict가 아닐 때) 실제 호출로 대체합니다.
+        """
+        if self.mode == "replay":
+            recorded = self.lookup(kind, request)
+            if recorded is not None:
+                return deserialize(recorded)
+            return real_call()
+
+        response = real_call()
+        self.record(kind, request, serialize(response))
+        return response
+
+
+# --- 1. OHLCV (yfinance) ---
+
+def _serialize_frame(df: pd.DataFrame) -> Dict[str, Any]:
+    index = df.index
+    return {
+        "index_name": index.name,
+        "tz": str(index.tz) if getattr(index, "tz", None) is not None else None,
+        "index": [ts.isoformat() for ts in index],
+        "columns": list(df.columns),
+        "data": df.astype(object).where(df.notna(), None).values.tolist(),
+    }
+
+
+def _deserialize_frame(data: Dict[str, Any]) -> pd.DataFrame:
+    if data["tz"]:
+        index = pd.to_datetime(data["index"], utc=True).tz_convert(data["tz"])
+    else:
+        index = pd.to_datetime(data["index"])
+    index.name = data["index_name"]
+    return pd.DataFrame(data["data"], columns=data["columns"], index=index).infer_objects()
+
+
+class _CassetteTicker:
+    def __init__(self, cassette: Cassette, real_yf, ticker: str):
+        self._cassette = cassette
+        self._real_yf = real_yf
+        self.ticker = ticker
+
+    def history(self, period: str = "1mo", interval: str = "1d", **kwargs) -> pd.DataFrame:
+        request = {"ticker": self.ticker, "period": period, "interval": interval, **kwargs}
+        return self._cassette.call(
+            "ohlcv", request,
+            lambda: self._real_yf.Ticker(self.ticker).history(period=period, interval=interval, **kwargs),
+            _serialize_frame, _deserialize_frame,
+        )
+
+
+class _CassetteYFinance:
+    """`yfinance` 모듈 대체 객체 (Ticker().history()만 카세트를 거칩니다.)"""
+
+    def __init__(self, cassette: Cassette, real_yf):
+        self._cassette = cassette
+        self._real_yf = real_yf
+
+    def Ticker(self, ticker: str) -> _CassetteTicker:
+        return _CassetteTicker(self._cassette, self._real_yf, ticker)
+
+
+# --- 2. SerpAPI (GoogleSearch) ---
+
+def _make_cassette_google_search(cassette: Cassette, real_google_search):
+
+    class CassetteGoogleSearch:
+        def __init__(self, params: Dict[str, Any]):
+            self.params = params
+
+        def get_dict(self) -> Dict[str, Any]:
+            # API 키는 카세트에 저장하지 않습니다.
+            request = {k: v for k, v in self.params.items() if k != "api_key"}
+            return cassette.call(
+                "search", request,
+                lambda: real_google_search(self.params).get_dict(),
+                lambda response: response, lambda response: response,
+            )
+
+    return CassetteGoogleSearch
+
+
+# --- 3. LLM (ChatOpenAI) ---
+
+def _llm_request(model: ChatOpenAI, messages: List[BaseMessage], stop, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    LLM 요청을 매칭용 dict로 변환합니다.
+    (메시지/도구 호출 id는 실행마다 달라지므로 제외하고 내용만 사용합니다.)
+    """
+    serialized = []
+    for message in messages:
+        item = {"type": message.type, "content": message.content}
+        if isinstance(message, AIMessage) and message.tool_calls:
+            item["tool_calls"] = [{"name": c["name"], "args": c["args"]} for c in message.tool_calls]
+        if getattr(message, "name", None):
+            item["name"] = message.name
+        serialized.append(item)
+
+    tools = [t.get("function", {}).get("name") for t in kwargs.get("tools", []) if isinstance(t, dict)]
+    return {"model": model.model_name, "messages": serialized, "stop": stop, "tools": tools}
+
+
+def _serialize_result(result: ChatResult) -> Dict[str, Any]:
+    return {
+        "message": message_to_dict(result.generations[0].message),
+        "llm_output": result.llm_output,
+    }
+
+
+def _deserialize_result(data: Dict[str, Any]) -> ChatResult:
+    message = messages_from_dict([data["message"]])[0]
+    return ChatResult(generations=[ChatGeneration(message=message)], llm_output=data["llm_output"])
+
+
+def _patched_llm_methods(cassette: Cassette):
+    original_generate = ChatOpenAI._generate
+    original_agenerate = ChatOpenAI._agenerate
+    original_stream = ChatOpenAI._stream
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return cassette.call(
+            "llm", _llm_request(self, messages, stop, kwargs),
+            lambda: original_generate(self, messages, stop=stop, run_manager=run_manager, **kwargs),
+            _serialize_result, _deserialize_result,
+        )
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        request = _llm_request(self, messages, stop, kwargs)
+        if cassette.mode == "replay":
+            recorded = cassette.lookup("llm", request)
+            if recorded is not None:
+                return _deserialize_result(recorded)
+            return await original_agenerate(self, messages, stop=stop, run_manager=run_manager, **kwargs)
+        result = await original_agenerate(self, messages, stop=stop, run_manager=run_manager, **kwargs)
+        cassette.record("llm", request, _serialize_result(result))
+        return result
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        request = _llm_request(self, messages, stop, kwargs)
+        if cassette.mode == "replay":
+            recorded = cassette.lookup("llm", request)
+            if recorded is not None:
+                # 기록된 응답을 줄 단위 청크로 나누어 스트리밍을 재현합니다.
+                message = _deserialize_result(recorded).generations[0].message
+                for line in str(message.content).splitlines(keepends=True):
+                    yield ChatGenerationChunk(message=AIMessageChunk(content=line))
+                return
+            yield from original_stream(self, messages, stop=stop, run_manager=run_manager, **kwargs)
+            return
+
+        merged = None
+        for chunk in original_stream(self, messages, stop=stop, run_manager=run_manager, **kwargs):
+            merged = chunk if merged is None else merged + chunk
+            yield chunk
+        if merged is not None:
+            message = AIMessage(content=merged.message.content, tool_calls=getattr(merged.message, "tool_calls", []))
+            cassette.record("llm", request, {"message": message_to_dict(message), "llm_output": None})
+
+    return {
+        "_generate": (original_generate, _generate),
+        "_agenerate": (original_agenerate, _agenerate),
+        "_stream": (original_stream, _stream),
+    }
+
+
+@contextmanager
+def use_cassette(path, mode: str = "replay", strict: bool = False):
+    """
+    블록 안에서 발생하는 모든 외부 I/O(LLM / 검색 / OHLCV)를 카세트로 기록하거나 재생합니다.
+    record 모드에서는 블록이 끝날 때 카세트 파일을 저장하고,
+    strict replay 모드에서는 블록 안에서 기록에 없던 요청이 하나라도 있었다면 블록이 끝날 때 CassetteMiss를 발생시킵니다.
+    """
+    from .tools import market_data, technical_analysis, search
+
+    cassette = Cassette(path, mode=mode, strict=strict)
+    originals = {
+        (market_data, "yf"): market_data.yf,
+        (technical_analysis, "yf"): technical_analysis.yf,
+        (search, "GoogleSearch"): search.GoogleSearch,
+    }
+    llm_methods = _patched_llm_methods(cassette)
+
+    market_data.yf = _CassetteYFinance(cassette, originals[(market_data, "yf")])
+    technical_analysis.yf = _CassetteYFinance(cassette, originals[(technical_analysis, "yf")])
+    search.GoogleSearch = _make_cassette_google_search(cassette, originals[(search, "GoogleSearch")])
+    for name, (_, patched) in llm_methods.items():
+        setattr(ChatOpenAI, name, patched)
+
+    try:
+        yield cassette
+        if mode == "record":
+            cassette.save()
+        cassette.raise_for_misses()
+    finally:
+        for (module, name), original in originals.items():
+            setattr(module, name, original)
+        for name, (original, _) in llm_methods.items():
+            setattr(ChatOpenAI, name, original)
+
+
+@contextmanager
+def cassette_from_settings():
+    """
+    환경 변수(settings.CASSETTE_MODE / CASSETTE_PATH / CASSETTE_STRICT)에 따라 카세트를 적용합니다.
+    모드가 설정되지 않았으면 아무 것도 하지 않습니다.
+    """
+    if settings.CASSETTE_MODE not in ("record", "replay"):
+        yield None
+        return
+    with use_cassette(settings.CASSETTE_PATH, mode=settings.CASSETTE_MODE, strict=settings.CASSETTE_STRICT) as cassette:
+        yield cassette
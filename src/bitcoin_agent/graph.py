@@ -1,18 +1,23 @@
-from langgraph.graph import StateGraph, END
+from langgraph.graph import StateGraph, START, END
 from langgraph.prebuilt import ToolNode
-from typing import Literal
+from langgraph.constants import Send
+from typing import Literal, List, Union
 
 # 1. Agent의 상태(State)와 도구(Tools)들을 가져옵니다.
 from .state import AgentState
 from .tools.market_data import get_ohlcv_data
 from .tools.technical_analysis import calculate_technical_indicators
 from .tools.search import google_search
+from .intent import extract_tickers
+from . import settings
 
 # 2. Agent의 "뇌" 역할을 하는 노드(Node)들을 가져옵니다.
 # (아직 파일은 없지만, 곧 생성할 것이므로 import 구문을 미리 작성합니다.)
 from .agents.planner import planner_agent
 from .agents.analysis import analysis_agent
 from .agents.reflection import reflection_agent
+from .agents.comparison import ticker_worker, news_worker, comparison_merge
+from .agents.pipeline import pipelined_analysis_agent
 
 
 # 3. 도구 리스트 및 ToolNode 정의 (Req 3)
@@ -51,11 +56,36 @@ def conditional_router(state: AgentState) -> Literal["tool_executor", "analysis"
     return "analysis"
 
 
+# [추가] 진입 라우터: 비교 분석 모드 (다중 티커 Fan-out)
+def entry_router(state: AgentState) -> Union[Literal["planner"], List[Send]]:
+    """
+    그래프 시작 시 호출되는 조건부 엣지입니다.
+
+    - (A) 질문에 티커가 2개 이상이면 (예: "BTC vs ETH vs SOL 추세 비교")
+          -> 티커마다 'ticker_worker'를, 뉴스 검색용으로 'news_worker'를 Send API로 *병렬* 실행합니다.
+             N개 티커 비교의 소요 시간이 단일 티커와 비슷하게 유지됩니다.
+    - (B) 그 외에는 -> 기존과 동일하게 'planner'로 보냅니다.
+    """
+    tickers = extract_tickers(state.get("query", ""))
+    if len(tickers) < 2:
+        return "planner"
+
+    sends = [Send("ticker_worker", {"ticker": ticker}) for ticker in tickers]
+    sends.append(Send("news_worker", {"tickers": tickers}))
+    return sends
+
+
 # 5. 그래프(Graph) 생성 및 조립
-def create_graph():
+def create_graph(pipelined: bool = None):
     """
     LangGraph의 StateGraph를 생성하고 노드와 엣지를 조립합니다.
+
+    Args:
+        pipelined: True면 'analysis' 노드가 초안을 스트리밍하면서 섹션 단위 비평까지 겹쳐 실행합니다.
+                   (별도의 'reflection' 노드 없이 analysis -> planner. 기본값: settings.PIPELINED_REFLECTION)
     """
+    if pipelined is None:
+        pipelined = settings.PIPELINED_REFLECTION
     
     # AgentState를 기반으로 상태 그래프를 초기화합니다.
     graph_builder = StateGraph(AgentState)
@@ -70,29 +100,51 @@ def create_graph():
     graph_builder.add_node("tool_executor", tool_node)
     
     # 3. 분석 노드: 수집된 데이터를 바탕으로 분석 초안 작성
-    graph_builder.add_node("analysis", analysis_agent)
+    #    [추가] 파이프라인 모드에서는 초안 스트리밍과 섹션 단위 비평을 함께 수행하는 노드를 사용합니다.
+    graph_builder.add_node("analysis", pipelined_analysis_agent if pipelined else analysis_agent)
     
     # 4. 비평 노드: 'analysis'의 초안을 검토하고 피드백 (Req 2)
-    graph_builder.add_node("reflection", reflection_agent)
+    #    (파이프라인 모드에서는 'analysis' 노드가 비평까지 마치므로 추가하지 않습니다.)
+    if not pipelined:
+        graph_builder.add_node("reflection", reflection_agent)
+    
+    # 5. (비교 분석 모드) 티커별 데이터/지표 수집, 뉴스 수집, 결과 병합 노드
+    graph_builder.add_node("ticker_worker", ticker_worker)
+    graph_builder.add_node("news_worker", news_worker)
+    graph_builder.add_node("comparison_merge", comparison_merge)
     
     
     # --- 5.2. 엣지(Edge) 정의 ---
     # 노드와 노드 간의 흐름(제어)을 정의합니다.
     
     # 1. 시작점(Entry Point) 설정
-    #    사용자 요청이 들어오면 가장 먼저 'planner' 노드를 실행합니다.
-    graph_builder.set_entry_point("planner")
+    #    사용자 요청이 들어오면 'entry_router'가 'planner'(단일 티커) 또는
+    #    병렬 워커들(비교 분석 모드) 중 어디로 보낼지 결정합니다.
+    graph_builder.add_conditional_edges(
+        START,
+        entry_router,
+        ["planner", "ticker_worker", "news_worker"]
+    )
     
     # 2. 일반 엣지 (A -> B로 항상 이동)
     
     # 'tool_executor' (도구 실행) -> 'planner' (결과 보고 및 다음 계획)
     graph_builder.add_edge("tool_executor", "planner")
     
-    # 'analysis' (초안 작성) -> 'reflection' (초안 비평)
-    graph_builder.add_edge("analysis", "reflection")
-    
-    # 'reflection' (비평) -> 'planner' (비평 내용 검토 및 다음 계획)
-    graph_builder.add_edge("reflection", "planner")
+    if pipelined:
+        # 'analysis' (초안 작성 + 섹션 단위 비평) -> 'planner' (병합된 비평 검토 및 다음 계획)
+        graph_builder.add_edge("analysis", "planner")
+    else:
+        # 'analysis' (초안 작성) -> 'reflection' (초안 비평)
+        graph_builder.add_edge("analysis", "reflection")
+        
+        # 'reflection' (비평) -> 'planner' (비평 내용 검토 및 다음 계획)
+        graph_builder.add_edge("reflection", "planner")
+    
+    # (비교 분석 모드) 병렬 워커들 -> 'comparison_merge' (모든 워커가 끝난 뒤 한 번 실행) -> 'analysis'
+    graph_builder.add_edge("ticker_worker", "comparison_merge")
+    graph_builder.add_edge("news_worker", "comparison_merge")
+    graph_builder.add_edge("comparison_merge", "analysis")
 
     # 3. 조건부 엣지 (Conditional Edge) (A -> B 또는 C 또는 D)
     #    [Req 1, 4] 이 부분이 LangGraph의 핵심입니다.
@@ -0,0 +1,93 @@
+import re
+from typing import List, Dict, Any
+
+from . import settings
+
+# 사용자 질문(query)에서 분석 의도(티커 등)를 추출하는 헬퍼 모음입니다.
+# LLM을 호출하지 않고 규칙 기반으로 동작하므로, 그래프 진입 전에 가볍게 사용할 수 있습니다.
+
+
+def _keyword_pattern(keyword: str) -> str:
+    """영문 별칭/키워드는 단어 경계로, 한글은 부분 문자열로 매칭하는 정규식을 만듭니다. (예: 'rsi'는 'conversion'에 매칭되지 않음)"""
+    if keyword.isascii():
+        return rf"(?<![a-z]){re.escape(keyword)}(?![a-z])"
+    return re.escape(keyword)
+
+
+def _alias_pattern(alias: str) -> str:
+    """
+    티커 별칭용 정규식. 한글 별칭은 앞에 한글 음절이 붙지 않고, 뒤에는 조사(settings.INTENT_PARTICLES)만 올 수 있습니다.
+    (예: '리플'은 '리플', '리플과'에는 매칭되지만 '트리플', '리플레이'에는 매칭되지 않음)
+    """
+    if alias.isascii():
+        return _keyword_pattern(alias)
+    particles = "|".join(re.escape(p) for p in sorted(settings.INTENT_PARTICLES, key=len, reverse=True))
+    return rf"(?<![가-힣]){re.escape(alias)}(?:{particles})?(?![가-힣])"
+
+
+def extract_tickers(query: str) -> List[str]:
+    """
+    질문에 등장한 티커를 등장 순서대로(중복 없이) 반환합니다.
+
+    예: "BTC vs ETH vs SOL 추세 비교" -> ['BTC-USD', 'ETH-USD', 'SOL-USD']
+    """
+    text = (query or "").lower()
+    positions = {}
+    for ticker, aliases in settings.TICKER_ALIASES.items():
+        for alias in aliases:
+            match = re.search(_alias_pattern(alias.lower()), text)
+            if match and (ticker not in positions or match.start() < positions[ticker]):
+                positions[ticker] = match.start()
+
+    return sorted(positions, key=positions.get)
+
+
+def _match_keyword(text: str, keywords_by_label: dict, default: str) -> str:
+    """키워드가 가장 먼저 매칭된 라벨을 반환합니다. (여러 라벨이 매칭되면 default)"""
+    matched = [label for label, keywords in keywords_by_label.items()
+               if any(re.search(_keyword_pattern(k), text) for k in keywords)]
+    return matched[0] if len(matched) == 1 else default
+
+
+def _unclassified_terms(text: str) -> List[str]:
+    """
+    티커 별칭, 기간/초점 키워드, 추세 표현/불용어(settings.INTENT_FILLER_WORDS)를 모두 제거하고 남은 단어들을 반환합니다.
+    (조사만 남은 토큰은 무시합니다. 예: "비트코인의 추세는?" -> [])
+    """
+    known = [alias for aliases in settings.TICKER_ALIASES.values() for alias in aliases]
+    for keywords_by_label in (settings.HORIZON_KEYWORDS, settings.FOCUS_KEYWORDS):
+        known.extend(k for keywords in keywords_by_label.values() for k in keywords)
+    known.extend(settings.INTENT_FILLER_WORDS)
+
+    # 긴 표현부터 제거해야 '분석'보다 '분석해줘' 같은 표현이 먼저 처리됩니다.
+    for keyword in sorted(known, key=len, reverse=True):
+        text = re.sub(_keyword_pattern(keyword.lower()), " ", text)
+
+    terms = re.findall(r"[가-힣]+|[a-z0-9][a-z0-9\-]*", text)
+    return [term for term in terms if term not in settings.INTENT_PARTICLES]
+
+
+def classify_intent(query: str) -> Dict[str, Any]:
+    """
+    질문을 정규화된 의도(intent)로 분류합니다.
+    표현이 달라도 같은 의도라면 같은 결과가 나오므로, 리포트 캐시의 키로 사용합니다.
+
+    예: "최근 비트코인 트렌드", "요즘 비트코인 최근 흐름 어때?"
+        -> {'tickers': ('BTC-USD',), 'horizon': 'short', 'focus': 'general', 'confident': True}
+
+    'confident'는 질문이 티커/키워드/추세 표현만으로 이루어져 있어 분류를 확신할 수 있는지를 나타냅니다.
+    (예: "비트코인 채굴 난이도"는 기본값 의도로 분류되지만 confident=False -> 캐시 키로 쓰면 안 됨)
+    """
+    text = (query or "").lower()
+    tickers = tuple(extract_tickers(query)) or (settings.DEFAULT_TICKER,)
+    return {
+        "tickers": tickers,
+        "horizon": _match_keyword(text, settings.HORIZON_KEYWORDS, "mid"),
+        "focus": _match_keyword(text, settings.FOCUS_KEYWORDS, "general"),
+        "confident": not _unclassified_terms(text),
+    }
+
+
+def intent_key(intent: Dict[str, Any]) -> str:
+    """의도(dict)를 캐시 키 문자열로 변환합니다. (예: 'BTC-USD|short|general', 티커 순서는 무시)"""
+    return f"{','.join(sorted(intent['tickers']))}|{intent['horizon']}|{intent['focus']}"
@@ -0,0 +1,298 @@
+import os
+import json
+import time
+import argparse
+import tracemalloc
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+from uuid import UUID
+
+import numpy as np
+import pandas as pd
+from langchain_core.callbacks import BaseCallbackHandler
+
+from . import settings
+from .mock_openai_server import MockOpenAIServer
+from .prompt_cache_metrics import PrefixCacheTracker
+
+# [부하 테스트 하네스]
+# 동시 요청 상황에서 그래프의 처리량(throughput)을 측정하여 배포 규모를 산정하기 위한 도구입니다.
+#   1. 로컬 mock OpenAI 호환 서버를 띄우고 세 Agent(planner/analysis/reflection)의 ChatOpenAI를 그 서버로 연결하며,
+#   2. yfinance / SerpAPI를 스텁(stub) 백엔드로 교체한 뒤,
+#   3. 목표 요청률(req/s)로 컴파일된 그래프를 실행하여
+#   4. 처리량, 종단 간(E2E) 및 노드별 p50/p95/p99 지연, 세션당 메모리, prefix 캐시 적중 토큰을 보고합니다.
+#
+# 실행 예: python -m src.bitcoin_agent.loadtest --rate 5 --requests 100 --latency lognormal:-1.0,0.5
+
+
+# --- 1. 스텁 백엔드 (yfinance / SerpAPI) ---
+
+def _period_to_days(period: str) -> int:
+    """yfinance 기간 문자열을 대략적인 일수로 변환합니다. (예: '30d' -> 30, '1y' -> 365)"""
+    unit_days = {"d": 1, "wk": 7, "mo": 30, "y": 365}
+    for unit, days in unit_days.items():
+        if period.endswith(unit) and period[:-len(unit)].isdigit():
+            return int(period[:-len(unit)]) * days
+    return 365
+
+
+class StubTicker:
+    """`yf.Ticker`를 대신하여 랜덤 워크 OHLCV DataFrame을 반환합니다."""
+
+    def __init__(self, ticker: str, latency: float = 0.0):
+        self.ticker = ticker
+        self.latency = latency
+
+    def history(self, period: str = "1mo", interval: str = "1d") -> pd.DataFrame:
+        time.sleep(self.latency)
+        days = _period_to_days(period)
+        rng = np.random.default_rng(abs(hash((self.ticker, period))) % (2 ** 32))
+        close = 60000 * np.exp(np.cumsum(rng.normal(0.001, 0.02, days)))
+        index = pd.date_range(end=pd.Timestamp.today().normalize(), periods=days, freq="D", name="Date")
+        return pd.DataFrame({
+            "Open": close * (1 + rng.normal(0, 0.005, days)),
+            "High": close * 1.01,
+            "Low": close * 0.99,
+            "Close": close,
+            "Volume": rng.integers(10 ** 9, 5 * 10 ** 9, days),
+            "Dividends": 0.0,
+            "Stock Splits": 0.0,
+        }, index=index)
+
+
+class StubYFinance:
+    """`yfinance` 모듈 대체 객체 (Ticker만 제공)"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    def Ticker(self, ticker: str) -> StubTicker:
+        return StubTicker(ticker, self.latency)
+
+
+def make_stub_google_search(latency: float = 0.0):
+    """`serpapi.GoogleSearch`를 대신하는 클래스를 만듭니다. (중복 기사를 일부 포함)"""
+
+    class StubGoogleSearch:
+        def __init__(self, params: Dict[str, Any]):
+            self.params = params
+
+        def get_dict(self) -> Dict[str, Any]:
+            time.sleep(latency)
+            return {"organic_results": [
+                {"title": "Bitcoin rallies as ETF inflows hit record", "link": "https://example.com/1",
+                 "snippet": "Bitcoin rallied on strong spot ETF inflows, traders said."},
+                {"title": "Bitcoin rallies as ETF inflows hit record - wire", "link": "https://example.com/2",
+                 "snippet": "Bitcoin rallied on strong spot ETF inflows, traders said."},
+                {"title": "비트코인, 규제 우려에 약세", "link": "https://example.com/3",
+                 "snippet": "미국 규제 당국의 발언 이후 비트코인이 약세를 보였다."},
+            ]}
+
+    return StubGoogleSearch
+
+
+def install_stubs(base_url: str, backend_latency: float = 0.0):
+    """
+    Agent들과 도구들을 부하 테스트용 백엔드로 교체합니다.
+    (agents 모듈은 import 시점에 체인을 생성하므로, base_url 설정 후 체인을 다시 만듭니다.)
+    """
+    settings.OPENAI_BASE_URL = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "sk-loadtest")
+    os.environ.setdefault("SERPAPI_API_KEY", "loadtest")
+
+    from .tools import market_data, technical_analysis, search
+    from .agents import planner, analysis, reflection
+
+    stub_yf = StubYFinance(backend_latency)
+    market_data.yf = stub_yf
+    technical_analysis.yf = stub_yf
+    search.GoogleSearch = make_stub_google_search(backend_latency)
+
+    planner.planner_chain = planner.create_planner_agent()
+    analysis.analysis_chain = analysis.create_analysis_agent()
+    reflection.reflection_chain = reflection.create_reflection_agent()
+    reflection.section_reflection_chain = reflection.create_section_reflection_agent()
+
+
+# --- 2. 세션 실행 및 측정 ---
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """nearest-rank 방식의 백분위수"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(np.ceil(pct / 100 * len(ordered))))
+    return ordered[rank - 1]
+
+
+class NodeTimer(BaseCallbackHandler):
+    """
+    노드 실행 시작/종료 시각으로 노드별 소요 시간을 재는 콜백 핸들러 (스레드 안전)
+    (병렬로 실행되는 ticker_worker / news_worker도 각각 따로 측정됩니다.)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started: Dict[UUID, tuple] = {}
+        self.latencies: List[tuple] = []
+
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, metadata: Optional[Dict[str, Any]] = None, **kwargs):
+        # 노드 자체의 실행만 측정합니다. (노드 안의 체인/라우터도 같은 metadata['langgraph_node']를 가지므로 이름으로 구분)
+        node = (metadata or {}).get("langgraph_node")
+        if node and node == kwargs.get("name") and not node.startswith("__"):
+            with self._lock:
+                self._started[run_id] = (node, time.perf_counter())
+
+    def _finish(self, run_id: UUID):
+        with self._lock:
+            started = self._started.pop(run_id, None)
+            if started:
+                node, started_at = started
+                self.latencies.append((node, time.perf_counter() - started_at))
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs):
+        self._finish(run_id)
+
+    def on_chain_error(self, error, *, run_id: UUID, **kwargs):
+        self._finish(run_id)
+
+
+def run_session(app, query: str, tracker: Optional[PrefixCacheTracker] = None) -> Dict[str, Any]:
+    """그래프를 1회 실행하며 종단 간(E2E) 및 노드별 소요 시간(NodeTimer)을 측정합니다."""
+    started = time.perf_counter()
+    timer = NodeTimer()
+    final_report = None
+    config = {"callbacks": [timer, tracker] if tracker else [timer]}
+
+    for event in app.stream({"query": query, "messages": []}, config=config, stream_mode="updates"):
+        for update in event.values():
+            if update and update.get("final_report"):
+                final_report = update["final_report"]
+
+    return {
+        "e2e": time.perf_counter() - started,
+        "nodes": timer.latencies,
+        "ok": final_report is not None,
+    }
+
+
+def measure_session_memory(app, query: str, sessions: int = 3) -> int:
+    """
+    세션 1회 동안 추가로 할당된 최대 메모리(bytes)를 tracemalloc으로 측정합니다.
+    (첫 실행은 import/체인 초기화/캐시 적재가 섞이므로 측정하지 않는 워밍업으로 돌리고, 이후 sessions회 측정의 중앙값을 반환합니다.)
+    """
+    run_session(app, query)
+
+    peaks = []
+    for _ in range(max(1, sessions)):
+        tracemalloc.start()
+        try:
+            baseline = tracemalloc.get_traced_memory()[0]
+            run_session(app, query)
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+        finally:
+            tracemalloc.stop()
+    return int(np.median(peaks))
+
+
+def drive(app, query: str, rate: float, total_requests: int, concurrency: int,
+          tracker: Optional[PrefixCacheTracker] = None) -> Dict[str, Any]:
+    """
+    목표 요청률(rate, req/s)로 total_requests건을 개루프(open-loop) 방식으로 실행합니다.
+    (앞선 요청의 완료를 기다리지 않고, 정해진 시각마다 새 세션을 시작합니다.)
+    """
+    results: List[Dict[str, Any]] = []
+    errors: List[str] = []
+    in_flight = {"now": 0, "max": 0}
+    lock = threading.Lock()
+
+    def worker():
+        with lock:
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        try:
+            result = run_session(app, query, tracker)
+            with lock:
+                results.append(result)
+        except Exception as e:
+            with lock:
+                errors.append(str(e))
+        finally:
+            with lock:
+                in_flight["now"] -= 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for i in range(total_requests):
+            delay = started + i / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(worker)
+    wall_time = time.perf_counter() - started
+
+    return {"results": results, "errors": errors, "wall_time": wall_time, "max_in_flight": in_flight["max"]}
+
+
+def summarize(run: Dict[str, Any], session_memory: int) -> Dict[str, Any]:
+    """측정 결과를 보고서(dict)로 집계합니다."""
+    results = run["results"]
+    e2e = [r["e2e"] for r in results]
+
+    per_node: Dict[str, List[float]] = {}
+    for result in results:
+        for node_name, latency in result["nodes"]:
+            per_node.setdefault(node_name, []).append(latency)
+
+    def stats(values: List[float]) -> Dict[str, Any]:
+        return {f"p{p}": round(percentile(values, p), 4) for p in (50, 95, 99)} if values else {}
+
+    return {
+        "completed": len(results),
+        "failed_reports": sum(not r["ok"] for r in results),
+        "errors": len(run["errors"]),
+        "wall_time_s": round(run["wall_time"], 2),
+        "throughput_rps": round(len(results) / run["wall_time"], 3) if run["wall_time"] else None,
+        "max_in_flight": run["max_in_flight"],
+        "e2e_s": stats(e2e),
+        "nodes_s": {name: {**stats(values), "count": len(values)} for name, values in per_node.items()},
+        "memory_per_session_kb": round(session_memory / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="mock LLM 서버와 스텁 백엔드를 사용한 그래프 부하 테스트")
+    parser.add_argument("--rate", type=float, default=2.0, help="목표 요청률 (req/s)")
+    parser.add_argument("--requests", type=int, default=20, help="총 요청 수")
+    parser.add_argument("--concurrency", type=int, default=64, help="최대 동시 세션 수")
+    parser.add_argument("--latency", default="lognormal:-1.0,0.5", help="mock LLM 지연 분포 (fixed:S | uniform:A,B | lognormal:MU,SIGMA)")
+    parser.add_argument("--backend-latency", type=float, default=0.05, help="스텁 데이터/검색 백엔드 지연(초)")
+    parser.add_argument("--script", help="mock LLM 응답 스크립트(JSON) 경로")
+    parser.add_argument("--query", default="최근 비트코인 트렌드 분석해줘")
+    parser.add_argument("--cache-min-tokens", type=int, default=1024, help="mock 서버 prefix 캐시의 최소 프롬프트 토큰 수")
+    parser.add_argument("--memory-sessions", type=int, default=3, help="세션당 메모리 측정 횟수 (워밍업 1회 후, 중앙값 보고)")
+    parser.add_argument("--pipelined", action="store_true", help="파이프라인 비평 모드 그래프로 측정 (기본값: settings.PIPELINED_REFLECTION)")
+    args = parser.parse_args()
+
+    script = None
+    if args.script:
+        with open(args.script, "r", encoding="utf-8") as f:
+            script = json.load(f)
+
+    with MockOpenAIServer(latency=args.latency, script=script, cache_min_tokens=args.cache_min_tokens) as server:
+        install_stubs(server.base_url, args.backend_latency)
+        from .graph import create_graph
+        app = create_graph(pipelined=True if args.pipelined else None)
+
+        session_memory = measure_session_memory(app, args.query, args.memory_sessions)
+        tracker = PrefixCacheTracker()
+        run = drive(app, args.query, args.rate, args.requests, args.concurrency, tracker)
+        report = summarize(run, session_memory)
+        report["llm_requests"] = server.request_count
+        report["prompt_cache"] = tracker.summary()
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
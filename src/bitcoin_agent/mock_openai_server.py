@@ -0,0 +1,307 @@
+import json
+import time
+import hashlib
+import uuid
+import random
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Dict, Any, Optional, Callable
+
+# [Mock OpenAI 호환 서버]
+# 부하 테스트/오프라인 검증용으로 `/v1/chat/completions`를 흉내 내는 로컬 HTTP 서버입니다.
+#   - 응답 지연(latency)을 분포(fixed / uniform / lognormal)로 설정할 수 있고,
+#   - 요청 내용에 따라 미리 작성한 스크립트(도구 호출 또는 텍스트)로 응답합니다.
+# ChatOpenAI의 base_url을 이 서버로 지정하면(settings.OPENAI_BASE_URL) 실제 API 없이 그래프 전체를 실행할 수 있습니다.
+# 또한 Provider의 prefix 캐시를 흉내 내어 usage.prompt_tokens_details.cached_tokens를 보고하므로,
+# 프롬프트 배치가 캐시 친화적인지 오프라인으로 검증할 수 있습니다.
+# 요청에 "stream": true가 있으면 응답을 줄 단위 SSE(chat.completion.chunk)로 나누어 지연을 분산해 보냅니다.
+
+
+# --- 1. 기본 응답 스크립트 ---
+# 위에서부터 순서대로 'match' 조건을 검사하여 처음 일치하는 규칙으로 응답합니다.
+#   - has_tools: 요청에 도구 스키마가 포함되었는지 (planner만 도구를 바인딩함)
+#   - has_tool_results: 대화에 도구 실행 결과(role='tool')가 있는지
+#   - contains: 마지막 메시지에 포함된 문자열
+DEFAULT_SCRIPT: List[Dict[str, Any]] = [
+    {
+        "match": {"has_tools": True, "has_tool_results": False},
+        "tool_calls": [
+            {"name": "calculate_technical_indicators", "args": {"ticker": "BTC-USD", "period": "1y"}},
+            {"name": "google_search", "args": {"query": "비트코인 최신 뉴스 및 시장 정서"}},
+        ],
+    },
+    {
+        "match": {"contains": "[분석 초안 중 한 섹션]"},
+        "content": "이상 없음",
+    },
+    {
+        "match": {"contains": "[분석 초안 전문]"},
+        "content": "매우 훌륭함. 이대로 최종 보고서로 승인해도 좋음.",
+    },
+    {
+        "match": {"has_tools": True, "contains": "- 비평: 수신 완료"},
+        "content": "[최종 보고서] 비트코인은 중기 상승 추세를 유지하고 있으나 단기 과열 신호에 유의해야 합니다.",
+    },
+    {
+        "match": {"has_tools": True},
+        "content": "데이터 수집 완료. 분석을 시작합니다.",
+    },
+    {
+        "content": "## 요약\n비트코인은 EMA-50이 EMA-200 위에 있어 중기 상승 추세입니다.\n\n"
+                   "## 기술적 분석\nRSI는 중립 구간이며 MACD 히스토그램은 양수입니다.\n\n"
+                   "## 시장 정서\n뉴스 정서는 전반적으로 긍정적입니다.",
+    },
+]
+
+
+# --- 2. 지연 분포 ---
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """
+    지연 분포 문자열을 샘플링 함수로 변환합니다. (단위: 초)
+
+    예: "fixed:0.5", "uniform:0.2,0.8", "lognormal:-1.0,0.5" (mu, sigma), "0" (지연 없음)
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",")] if params else []
+
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(values[0], values[1])
+    return lambda: float(kind)
+
+
+def estimate_tokens(text: str) -> int:
+    """대략적인 토큰 수 (문자 4개 ≈ 1토큰)"""
+    return max(1, len(text) // 4)
+
+
+# --- 3. 스크립트 매칭 ---
+
+def _message_text(message: Dict[str, Any]) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        content = "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+
+def match_rule(script: List[Dict[str, Any]], request: Dict[str, Any]) -> Dict[str, Any]:
+    """요청 본문에 대해 처음으로 일치하는 스크립트 규칙을 반환합니다."""
+    messages = request.get("messages", [])
+    has_tools = bool(request.get("tools"))
+    has_tool_results = any(m.get("role") == "tool" for m in messages)
+    last_text = _message_text(messages[-1]) if messages else ""
+
+    for rule in script:
+        match = rule.get("match", {})
+        if "has_tools" in match and match["has_tools"] != has_tools:
+            continue
+        if "has_tool_results" in match and match["has_tool_results"] != has_tool_results:
+            continue
+        if "contains" in match and match["contains"] not in last_text:
+            continue
+        return rule
+    return {"content": ""}
+
+
+class PrefixCache:
+    """
+    OpenAI의 prompt caching을 흉내 냅니다.
+    프롬프트(도구 스키마 -> 메시지 순)를 block_tokens 단위로 나누어, 이전 요청과 동일한 앞부분 블록 수만큼을
+    캐시 적중으로 계산합니다. (프롬프트가 min_tokens 미만이면 캐시하지 않음)
+    """
+
+    def __init__(self, min_tokens: int = 1024, block_tokens: int = 128):
+        self.min_tokens = min_tokens
+        self.block_tokens = block_tokens
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def prompt_text(request: Dict[str, Any]) -> str:
+        parts = [json.dumps(request.get("tools", []), ensure_ascii=False, sort_keys=True)]
+        parts.extend(json.dumps(m, ensure_ascii=False, sort_keys=True) for m in request.get("messages", []))
+        return "".join(parts)
+
+    def lookup_and_store(self, request: Dict[str, Any]) -> int:
+        """캐시된 토큰 수를 반환하고, 이번 요청의 prefix 블록들을 캐시에 저장합니다."""
+        text = self.prompt_text(request)
+        if estimate_tokens(text) < self.min_tokens:
+            return 0
+
+        block_chars = self.block_tokens * 4 # estimate_tokens()와 같은 기준 (문자 4개 ≈ 1토큰)
+        digest = hashlib.sha256()
+        prefixes = []
+        for start in range(0, len(text) - block_chars + 1, block_chars):
+            digest.update(text[start:start + block_chars].encode("utf-8"))
+            prefixes.append(digest.hexdigest())
+
+        with self._lock:
+            cached_blocks = 0
+            for prefix in prefixes:
+                if prefix not in self._seen:
+                    break
+                cached_blocks += 1
+            self._seen.update(prefixes)
+        return cached_blocks * self.block_tokens
+
+
+def build_completion(rule: Dict[str, Any], request: Dict[str, Any], prompt_tokens: int,
+                     cached_tokens: int = 0) -> Dict[str, Any]:
+    """스크립트 규칙으로 OpenAI chat.completion 응답 본문을 만듭니다."""
+    message: Dict[str, Any] = {"role": "assistant", "content": rule.get("content", "")}
+    finish_reason = "stop"
+
+    if rule.get("tool_calls"):
+        message["content"] = None
+        message["tool_calls"] = [
+            {
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+                "type": "function",
+                "function": {"name": call["name"], "arguments": json.dumps(call.get("args", {}), ensure_ascii=False)},
+            }
+            for call in rule["tool_calls"]
+        ]
+        finish_reason = "tool_calls"
+
+    completion_tokens = estimate_tokens(json.dumps(message, ensure_ascii=False))
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "mock"),
+        "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens},
+        },
+    }
+
+
+def build_stream_chunks(completion: Dict[str, Any], include_usage: bool = False) -> List[Dict[str, Any]]:
+    """
+    chat.completion 응답을 스트리밍용 chat.completion.chunk 목록으로 나눕니다.
+    (텍스트는 줄 단위로 나누고, 도구 호출은 한 번에 보냅니다.)
+    """
+    choice = completion["choices"][0]
+    message = choice["message"]
+    base = {key: completion[key] for key in ("id", "created", "model")}
+    base["object"] = "chat.completion.chunk"
+
+    def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> Dict[str, Any]:
+        return {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+
+    chunks = [chunk({"role": "assistant", "content": ""})]
+    if message.get("tool_calls"):
+        chunks.append(chunk({"tool_calls": [{"index": i, **call} for i, call in enumerate(message["tool_calls"])]}))
+    else:
+        chunks.extend(chunk({"content": line}) for line in (message["content"] or "").splitlines(keepends=True))
+    chunks.append(chunk({}, choice["finish_reason"]))
+
+    if include_usage:
+        chunks.append({**base, "choices": [], "usage": completion["usage"]})
+    return chunks
+
+
+# --- 4. HTTP 서버 ---
+
+class MockOpenAIServer:
+    """
+    백그라운드 스레드에서 동작하는 mock chat-completions 서버입니다.
+
+    사용 예:
+        with MockOpenAIServer(latency="lognormal:-1.0,0.5") as server:
+            settings.OPENAI_BASE_URL = server.base_url
+    """
+
+    def __init__(self, latency: str = "0", script: Optional[List[Dict[str, Any]]] = None,
+                 host: str = "127.0.0.1", port: int = 0, cache_min_tokens: int = 1024):
+        self.sample_latency = parse_latency(latency)
+        self.script = script or DEFAULT_SCRIPT
+        self.prefix_cache = PrefixCache(min_tokens=cache_min_tokens)
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def handle_completion(self, request: Dict[str, Any], latency: Optional[float] = None) -> Dict[str, Any]:
+        """요청 1건을 처리합니다. (지연 -> prefix 캐시 조회 -> 스크립트 매칭 -> 응답 생성)"""
+        with self._lock:
+            self.request_count += 1
+        time.sleep(max(0.0, self.sample_latency() if latency is None else latency))
+
+        prompt_tokens = estimate_tokens(PrefixCache.prompt_text(request))
+        cached_tokens = self.prefix_cache.lookup_and_store(request)
+        rule = match_rule(self.script, request)
+        return build_completion(rule, request, prompt_tokens, cached_tokens)
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if request.get("stream"):
+                    self._stream(request)
+                    return
+                body = json.dumps(server.handle_completion(request), ensure_ascii=False).encode("utf-8")
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _stream(self, request: Dict[str, Any]):
+                # 샘플링한 지연의 절반은 첫 토큰까지, 나머지 절반은 청크들 사이에 고르게 나누어 보냅니다.
+                latency = max(0.0, server.sample_latency())
+                completion = server.handle_completion(request, latency=latency / 2)
+                include_usage = bool((request.get("stream_options") or {}).get("include_usage"))
+                chunks = build_stream_chunks(completion, include_usage)
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                for chunk in chunks:
+                    time.sleep(latency / 2 / len(chunks))
+                    self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass # 부하 테스트 중 요청 로그 출력 생략
+
+        return Handler
+
+    def start(self) -> "MockOpenAIServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "MockOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,73 @@
+import threading
+from typing import Dict, Any, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+# [Prefix 캐시 계측]
+# OpenAI 등 Provider는 이전 요청과 byte 단위로 동일한 프롬프트 앞부분(prefix)을 캐시하고,
+# 응답의 usage에 캐시된 토큰 수를 알려줍니다. (usage.prompt_tokens_details.cached_tokens)
+# 이 콜백 핸들러는 노드(planner / analysis / reflection)별로 캐시된 토큰과 캐시되지 않은 토큰을 집계합니다.
+#
+# 사용 예:
+#     tracker = PrefixCacheTracker()
+#     app.invoke({"query": ..., "messages": []}, config={"callbacks": [tracker]})
+#     print(tracker.summary())
+
+
+def extract_prompt_usage(response: LLMResult) -> Dict[str, int]:
+    """
+    LLM 응답 메타데이터에서 프롬프트 토큰 수와 캐시된 토큰 수를 꺼냅니다.
+    (usage_metadata가 있으면 우선 사용하고, 없으면 llm_output['token_usage']의 원본 usage를 사용합니다.)
+    """
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                details = usage.get("input_token_details") or {}
+                return {"prompt_tokens": usage.get("input_tokens", 0), "cached_tokens": details.get("cache_read", 0) or 0}
+
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    details = token_usage.get("prompt_tokens_details") or {}
+    return {"prompt_tokens": token_usage.get("prompt_tokens", 0) or 0, "cached_tokens": details.get("cached_tokens", 0) or 0}
+
+
+class PrefixCacheTracker(BaseCallbackHandler):
+    """노드별 prefix 캐시 적중 토큰을 집계하는 LangChain 콜백 핸들러 (스레드 안전)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._run_nodes: Dict[UUID, str] = {}
+        self.totals: Dict[str, Dict[str, int]] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata: Optional[Dict[str, Any]] = None, **kwargs):
+        # LangGraph는 실행 중인 노드 이름을 metadata['langgraph_node']로 전달합니다.
+        node = (metadata or {}).get("langgraph_node", "unknown")
+        with self._lock:
+            self._run_nodes[run_id] = node
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs):
+        usage = extract_prompt_usage(response)
+        with self._lock:
+            node = self._run_nodes.pop(run_id, "unknown")
+            totals = self.totals.setdefault(node, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0})
+            totals["calls"] += 1
+            totals["prompt_tokens"] += usage["prompt_tokens"]
+            totals["cached_tokens"] += usage["cached_tokens"]
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """노드별 및 전체 {'calls', 'prompt_tokens', 'cached_tokens', 'uncached_tokens', 'hit_ratio'}"""
+        with self._lock:
+            rows = {node: dict(totals) for node, totals in self.totals.items()}
+
+        overall = {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0}
+        for totals in rows.values():
+            for key in overall:
+                overall[key] += totals[key]
+        rows["total"] = overall
+
+        for totals in rows.values():
+            totals["uncached_tokens"] = totals["prompt_tokens"] - totals["cached_tokens"]
+            totals["hit_ratio"] = round(totals["cached_tokens"] / totals["prompt_tokens"], 3) if totals["prompt_tokens"] else 0.0
+        return rows
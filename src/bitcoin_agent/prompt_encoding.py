@@ -0,0 +1,228 @@
+import re
+import math
+from typing import List, Dict, Any, Optional, Tuple
+
+from . import settings
+
+# [프롬프트 인코딩 계층]
+# analysis 프롬프트는 기술적 지표, 검색 결과, 원본 시장 데이터를 json.dumps(indent=2)로 덤프하고,
+# 수정 라운드마다 이전 초안 전체를 다시 붙이고 있었습니다. 이 모듈은
+#   1. State 데이터를 key=value / 표(table) 형태로 간결하게 렌더링하고 (의미 있는 자릿수로 반올림),
+#   2. 섹션별 토큰 예산(settings.PROMPT_SECTION_TOKEN_BUDGETS)을 강제하며,
+#   3. 수정 라운드에서는 초안 전체 대신 '섹션 단위 수정 요청'을 만들고,
+#   4. 섹션별 토큰 수를 보고합니다.
+
+
+# --- 1. 토큰 계산 ---
+
+_encoder = None
+_encoder_loaded = False
+
+
+def _get_encoder():
+    """tiktoken 인코더를 한 번만 로드합니다. (미설치 또는 오프라인으로 로드 실패 시 None)"""
+    global _encoder, _encoder_loaded
+    if not _encoder_loaded:
+        _encoder_loaded = True
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoder = None
+    return _encoder
+
+
+def count_tokens(text: str) -> int:
+    """텍스트의 토큰 수를 계산합니다. (tiktoken을 쓸 수 없으면 근사치: ASCII 4자 ≈ 1토큰, 그 외 1자 ≈ 1토큰)"""
+    encoder = _get_encoder()
+    if encoder is not None:
+        return len(encoder.encode(text))
+    ascii_chars = sum(1 for ch in text if ch.isascii())
+    return math.ceil(ascii_chars / 4) + (len(text) - ascii_chars)
+
+
+def truncate_to_budget(text: str, max_tokens: int) -> str:
+    """
+    토큰 예산을 넘으면 뒤쪽을 잘라내고 생략 표시를 붙입니다.
+    줄 단위로 담되, 예산을 넘기는 첫 줄은 들어가는 만큼 줄 안에서 자릅니다. (한 줄짜리 긴 섹션도 앞부분은 남음)
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+    marker = "...(생략)"
+    budget = max_tokens - count_tokens(" " + marker)
+
+    kept: List[str] = []
+    for line in text.splitlines():
+        if count_tokens("\n".join(kept + [line])) <= budget:
+            kept.append(line)
+            continue
+        # 이 줄이 들어가는 가장 긴 앞부분을 이진 탐색으로 찾습니다.
+        prefix = "\n".join(kept + [""]) if kept else ""
+        low, high = 0, len(line)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if count_tokens(prefix + line[:middle]) <= budget:
+                low = middle
+            else:
+                high = middle - 1
+        if low:
+            return "\n".join(kept + [line[:low].rstrip()]) + " " + marker
+        break
+    return "\n".join(kept + [marker])
+
+
+# --- 2. 간결한 렌더링 ---
+
+def format_number(value: Any) -> str:
+    """
+    숫자를 의미 있는 자릿수로 반올림하여 문자열로 만듭니다.
+    (예: 67234.5678 -> '67235', 55.2345 -> '55.23', 0.000123456 -> '0.0001235', None -> 'NA')
+    """
+    if value is None:
+        return "NA"
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, float) and math.isnan(value):
+        return "NA"
+    if abs(value) >= 1000:
+        return f"{value:.0f}"
+    if abs(value) >= 1:
+        return f"{value:.2f}".rstrip("0").rstrip(".")
+    return f"{value:.4g}"
+
+
+def render_kv(data: Dict[str, Any]) -> str:
+    """dict를 한 줄의 key=value 목록으로 렌더링합니다."""
+    return " ".join(f"{key}={format_number(value)}" for key, value in data.items())
+
+
+def render_table(rows: List[Dict[str, Any]], columns: Optional[List[str]] = None) -> str:
+    """dict 리스트를 '|' 구분 표로 렌더링합니다. (첫 줄은 컬럼명)"""
+    if not rows:
+        return "데이터 없음"
+    if columns is None:
+        columns = list(dict.fromkeys(key for row in rows for key in row))
+    lines = ["|".join(columns)]
+    lines.extend("|".join(format_number(row.get(column)) for column in columns) for row in rows)
+    return "\n".join(lines)
+
+
+def render_indicators(tech_data: Dict[str, Any]) -> str:
+    """
+    기술적 지표를 렌더링합니다.
+    (비교 분석 모드처럼 티커별 dict로 묶여 있으면 티커를 행으로 하는 표로 렌더링합니다.)
+    """
+    if tech_data and all(isinstance(value, dict) for value in tech_data.values()):
+        return render_table([{"ticker": ticker, **values} for ticker, values in tech_data.items()])
+    return render_kv(tech_data)
+
+
+# --- 3. 섹션 / 토큰 예산 ---
+
+class PromptBuilder:
+    """
+    섹션 단위로 프롬프트를 조립하며, 섹션별 토큰 예산을 강제하고 토큰 수를 기록합니다.
+
+    사용 예:
+        builder = PromptBuilder()
+        builder.add("technical", "[기술적 분석 데이터]", render_kv(tech_data))
+        text, report = builder.render(), builder.token_report
+    """
+
+    def __init__(self, budgets: Optional[Dict[str, int]] = None):
+        self.budgets = settings.PROMPT_SECTION_TOKEN_BUDGETS if budgets is None else budgets
+        self.sections: List[Tuple[str, str]] = []
+        self.token_report: Dict[str, int] = {}
+
+    def add(self, name: str, title: str, body: str, enforce_budget: bool = True):
+        """섹션을 추가합니다. (enforce_budget=False면 예산을 넘어도 자르지 않고 토큰 수만 기록)"""
+        budget = self.budgets.get(name)
+        if budget is not None and enforce_budget:
+            body = truncate_to_budget(body, budget)
+        section = f"{title}\n{body}" if title else body
+        self.sections.append((name, section))
+        self.token_report[name] = self.token_report.get(name, 0) + count_tokens(section)
+
+    def render(self, names: Optional[List[str]] = None) -> str:
+        """섹션들을 추가한 순서대로 이어 붙입니다. (names를 주면 해당 섹션만)"""
+        return "\n\n".join(section for name, section in self.sections if names is None or name in names)
+
+
+# --- 4. 섹션 단위 수정 (diff 방식 revision) ---
+
+# '[S2]', '[S2] (수정 대상)', '**[S2]**', '### [S2] ## 기술적 분석' 처럼 표시 뒤에 같은 줄로 본문이 이어지는 변형도 허용합니다.
+_SECTION_MARKER_RE = re.compile(r"^[ \t]*(?:[#*]+[ \t]*)?\[S(\d+)\]\**(?:[ \t]*\(수정 대상\))?[ \t:]*", re.MULTILINE)
+_WORD_RE = re.compile(r"[가-힣A-Za-z0-9]{2,}")
+
+
+def split_sections(draft: str) -> List[str]:
+    """초안을 마크다운 제목(#) 단위로, 제목이 없으면 빈 줄(문단) 단위로 나눕니다."""
+    if re.search(r"^#{1,6} ", draft, re.MULTILINE):
+        parts = re.split(r"(?m)^(?=#{1,6} )", draft)
+    else:
+        parts = re.split(r"\n\s*\n", draft)
+    return [part.strip() for part in parts if part.strip()]
+
+
+def select_target_sections(sections: List[str], reflection: str) -> List[int]:
+    """
+    비평(reflection)과 관련된 섹션 번호(0부터)를 고릅니다.
+    섹션 단어 중 비평에도 등장하는 단어의 비율로 관련도를 판단합니다.
+    """
+    reflection_words = set(_WORD_RE.findall(reflection))
+    targets = []
+    for i, section in enumerate(sections):
+        # 비평이 섹션 제목을 직접 언급한 경우 (예: "'시장 정서' 섹션에서 ...")
+        heading = section.splitlines()[0].lstrip("#").strip()
+        if section.startswith("#") and heading and heading in reflection:
+            targets.append(i)
+            continue
+        words = set(_WORD_RE.findall(section))
+        if words and len(words & reflection_words) / len(words) >= settings.REVISION_SECTION_OVERLAP:
+            targets.append(i)
+    return targets
+
+
+def build_revision_request(draft: str, reflection: str) -> Optional[Tuple[str, List[str]]]:
+    """
+    초안 전체 대신 '수정 대상 섹션의 전문 + 나머지 섹션의 첫 줄 목차'로 구성된 수정 요청을 만듭니다.
+
+    Returns:
+        (수정 요청 텍스트, 원본 섹션 리스트). 섹션이 하나뿐이거나, 비평과 관련된 섹션을 특정할 수 없거나,
+        모든 섹션이 대상이라 절약 효과가 없으면 None (-> 호출 측에서 초안 전체를 보내는 방식으로 대체).
+    """
+    sections = split_sections(draft)
+    if len(sections) < 2:
+        return None
+    targets = select_target_sections(sections, reflection)
+    if not targets or len(targets) == len(sections):
+        return None
+
+    lines = ["[기존 초안 구조] (수정 대상이 아닌 섹션은 첫 줄만 표시)"]
+    for i, section in enumerate(sections):
+        if i in targets:
+            lines.append(f"[S{i + 1}] (수정 대상)\n{section}")
+        else:
+            lines.append(f"[S{i + 1}] {section.splitlines()[0][:80]}")
+    return "\n".join(lines), sections
+
+
+def apply_section_edits(sections: List[str], response: str) -> Optional[str]:
+    """
+    '[S번호]' 표시로 구분된 수정 섹션들을 원본 섹션에 반영한 전체 초안을 반환합니다.
+    (표시와 같은 줄에 이어지는 텍스트도 해당 섹션 본문에 포함합니다.)
+    응답에서 섹션 표시를 찾지 못하면 None. 응답은 변경된 섹션만 담고 있으므로, 호출 측은 이를 초안 전체로 쓰지 말고
+    기존 초안을 유지하거나 초안 전체 수정 요청으로 다시 요청해야 합니다.
+    """
+    markers = list(_SECTION_MARKER_RE.finditer(response))
+    if not markers:
+        return None
+
+    updated = list(sections)
+    for marker, next_marker in zip(markers, markers[1:] + [None]):
+        index = int(marker.group(1)) - 1
+        body = response[marker.end():next_marker.start() if next_marker else len(response)].strip()
+        # (목차 줄만 그대로 되풀이한 경우는 변경이 아니므로 원본 섹션을 유지합니다.)
+        if 0 <= index < len(updated) and body and body != updated[index].splitlines()[0].strip():
+            updated[index] = body
+    return "\n\n".join(updated)
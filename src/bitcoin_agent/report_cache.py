@@ -0,0 +1,131 @@
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Optional, Dict, Callable
+
+from . import settings
+from .intent import classify_intent, intent_key
+
+# [리포트 캐시]
+# 운영 환경에서는 여러 사용자가 몇 분 사이에 거의 같은 질문("최근 비트코인 트렌드")을 보냅니다.
+# 매번 planner -> tool -> analysis -> reflection 전체 파이프라인을 실행하는 대신,
+#   1. 질문을 정규화된 의도(티커/기간/초점)로 분류하고,
+#   2. 같은 의도의 final_report가 신선도(freshness) 창 이내라면 캐시된 보고서를 반환하며,
+#   3. 같은 의도의 요청이 동시에 들어오면 진행 중인 단 한 번의 실행 결과를 함께 기다립니다(coalescing).
+# 의도를 확신할 수 없는 질문(예: "비트코인 채굴 난이도")은 캐시를 거치지 않고 항상 그래프를 실행합니다.
+
+
+class ReportCache:
+    """
+    의도(intent) 단위로 final_report를 캐시하는 스레드 안전(thread-safe) 캐시입니다.
+
+    Args:
+        graph: `invoke()`를 제공하는 컴파일된 그래프. (기본값: graph.app)
+        ttl_seconds (int): 시장 스냅샷의 신선도 창(초). (기본값: settings.REPORT_CACHE_TTL_SECONDS)
+        max_entries (int): 보관할 최대 의도 수. 초과 시 가장 오래된 항목부터 제거합니다.
+        clock (Callable[[], float]): 현재 시각 함수 (테스트용으로 교체 가능)
+    """
+
+    def __init__(self, graph=None, ttl_seconds: Optional[int] = None,
+                 max_entries: Optional[int] = None, clock: Callable[[], float] = time.monotonic):
+        self._graph = graph
+        self.ttl_seconds = settings.REPORT_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.max_entries = settings.REPORT_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict[str, object]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "bypassed": 0}
+
+    @property
+    def graph(self):
+        # graph.app은 import 시점에 LLM 체인을 생성하므로, 실제로 필요할 때 가져옵니다.
+        if self._graph is None:
+            from .graph import app
+            self._graph = app
+        return self._graph
+
+    def _run_graph(self, query: str) -> str:
+        """전체 Agent 그래프를 실행하여 final_report를 반환합니다."""
+        final_state = self.graph.invoke({"query": query, "messages": []})
+        report = final_state.get("final_report")
+        if not report:
+            raise RuntimeError(f"최종 분석 보고서를 생성하지 못했습니다. (질문: {query})")
+        return report
+
+    def get_report(self, query: str) -> str:
+        """
+        질문에 대한 final_report를 반환합니다.
+
+        - (A) 같은 의도의 신선한 캐시가 있으면 -> 즉시 반환 (hit)
+        - (B) 같은 의도의 실행이 진행 중이면 -> 그 결과를 함께 기다림 (coalesced)
+        - (C) 그 외에는 -> 그래프를 실행하고 결과를 캐시 (miss)
+        - (D) 의도를 확신할 수 없는 질문이면 -> 캐시 없이 그래프를 실행 (bypassed)
+        """
+        intent = classify_intent(query)
+        if not intent["confident"]:
+            with self._lock:
+                self.stats["bypassed"] += 1
+            return self._run_graph(query)
+        key = intent_key(intent)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and self._clock() - entry["snapshot_at"] <= self.ttl_seconds:
+                self.stats["hits"] += 1
+                return entry["report"]
+
+            future = self._inflight.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._inflight[key] = future
+                self.stats["misses"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if not is_owner:
+            return future.result()
+
+        # 시장 데이터는 실행 시작 직후 수집되므로, 스냅샷 시각은 (보수적으로) 실행 시작 시각으로 기록합니다.
+        snapshot_at = self._clock()
+        try:
+            report = self._run_graph(query)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(report)
+            with self._lock:
+                self._entries[key] = {"report": report, "snapshot_at": snapshot_at, "query": query}
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return report
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def invalidate(self, query: Optional[str] = None):
+        """특정 질문의 의도(또는 query가 없으면 전체) 캐시를 비웁니다."""
+        with self._lock:
+            if query is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(intent_key(classify_intent(query)), None)
+
+
+# 프로세스 전역에서 공유하는 기본 캐시 인스턴스
+_default_cache: Optional[ReportCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_report(query: str) -> str:
+    """기본(공유) ReportCache를 통해 질문에 대한 final_report를 반환합니다."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ReportCache()
+    return _default_cache.get_report(query)
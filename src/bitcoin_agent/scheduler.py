@@ -0,0 +1,217 @@
+import time
+import argparse
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Callable
+
+from . import settings
+from .tools.technical_analysis import calculate_technical_indicators
+from .intent import extract_tickers
+
+# [변화 감지 스케줄러]
+# 정해진 주기마다 보고서를 새로 만드는 대신,
+#   1. 주기마다 기술적 지표만 저렴하게 (LLM 없이) 갱신하고,
+#   2. 마지막으로 보고한 시점의 스냅샷과 비교하여 (가격 변화율, RSI 구간, MACD 히스토그램 부호, EMA 크로스)
+#   3. 의미 있는 변화가 있을 때만 전체 Agent 그래프를 실행합니다.
+#   4. 변화가 없으면 직전 보고서에 최신 수치만 갱신하여 다시 발행합니다.
+
+
+def _rsi_band(rsi: Optional[float], bands) -> Optional[str]:
+    if rsi is None:
+        return None
+    lower, upper = bands
+    if rsi <= lower:
+        return "과매도"
+    if rsi >= upper:
+        return "과매수"
+    return "중립"
+
+
+def _sign(value: Optional[float]) -> Optional[int]:
+    if value is None:
+        return None
+    return 1 if value > 0 else -1 if value < 0 else 0
+
+
+def detect_material_changes(previous: Dict[str, Any], current: Dict[str, Any],
+                            thresholds: Optional[Dict[str, Any]] = None) -> List[str]:
+    """
+    두 지표 스냅샷(`calculate_technical_indicators` 결과)을 비교하여 의미 있는 변화 목록을 반환합니다.
+    빈 리스트이면 변화가 없다는 뜻입니다.
+    """
+    thresholds = {**settings.SCHEDULER_THRESHOLDS, **(thresholds or {})}
+    reasons = []
+
+    # 1. 가격 변화율
+    prev_price, curr_price = previous.get("last_close_price"), current.get("last_close_price")
+    if prev_price and curr_price is not None:
+        change_pct = (curr_price - prev_price) / prev_price * 100
+        if abs(change_pct) >= thresholds["price_change_pct"]:
+            reasons.append(f"가격 변화 {change_pct:+.2f}% (기준 ±{thresholds['price_change_pct']}%)")
+
+    # 2. RSI 구간 이동 (예: 중립 -> 과매수)
+    prev_band = _rsi_band(previous.get("rsi_14"), thresholds["rsi_bands"])
+    curr_band = _rsi_band(current.get("rsi_14"), thresholds["rsi_bands"])
+    if prev_band and curr_band and prev_band != curr_band:
+        reasons.append(f"RSI 구간 변경 {prev_band} -> {curr_band}")
+
+    # 3. MACD 히스토그램 부호 전환
+    if thresholds["macd_histogram_flip"]:
+        prev_sign, curr_sign = _sign(previous.get("macd_histogram")), _sign(current.get("macd_histogram"))
+        if prev_sign and curr_sign and prev_sign != curr_sign:
+            reasons.append("MACD 히스토그램 " + ("양전환" if curr_sign > 0 else "음전환"))
+
+    # 4. EMA-50 / EMA-200 크로스
+    if thresholds["ema_cross"]:
+        def spread(snapshot):
+            if snapshot.get("ema_50") is None or snapshot.get("ema_200") is None:
+                return None
+            return _sign(snapshot["ema_50"] - snapshot["ema_200"])
+        prev_spread, curr_spread = spread(previous), spread(current)
+        if prev_spread and curr_spread and prev_spread != curr_spread:
+            reasons.append("EMA-50/200 " + ("골든 크로스" if curr_spread > 0 else "데드 크로스"))
+
+    return reasons
+
+
+def _format_number(value: Optional[float]) -> str:
+    return "N/A" if value is None else f"{value:,.2f}"
+
+
+def refresh_report(report: str, snapshot: Dict[str, Any]) -> str:
+    """직전 보고서 앞에 최신 지표 수치 블록을 붙여 다시 발행할 보고서를 만듭니다."""
+    header = "\n".join([
+        f"[최신 수치 갱신: {datetime.now().strftime('%Y-%m-%d %H:%M')}] (의미 있는 변화가 없어 직전 보고서를 유지합니다)",
+        f"- 종가: {_format_number(snapshot.get('last_close_price'))}",
+        f"- RSI(14): {_format_number(snapshot.get('rsi_14'))}",
+        f"- MACD 히스토그램: {_format_number(snapshot.get('macd_histogram'))}",
+        f"- EMA 50 / 200: {_format_number(snapshot.get('ema_50'))} / {_format_number(snapshot.get('ema_200'))}",
+    ])
+    return f"{header}\n\n{report}"
+
+
+def default_query(ticker: str) -> str:
+    """감시 티커에 맞는 기본 보고서 질문을 만듭니다."""
+    if ticker == settings.DEFAULT_TICKER:
+        return settings.SCHEDULER_DEFAULT_QUERY
+    return f"최근 {ticker} 트렌드 분석해줘"
+
+
+class ReportScheduler:
+    """
+    변화가 감지될 때만 전체 그래프를 실행하는 보고서 스케줄러입니다.
+
+    Args:
+        graph: `invoke()`를 제공하는 컴파일된 그래프. (기본값: graph.app)
+        query (str): 보고서 생성에 사용할 질문. (기본값: 티커로부터 생성. 질문이 다른 티커를 가리키면 ValueError)
+        ticker (str): 감시할 티커.
+        thresholds (dict): settings.SCHEDULER_THRESHOLDS 중 덮어쓸 값.
+        on_report (Callable[[str, List[str]], None]): 보고서 발행 시 호출할 함수. (보고서, 변화 사유)
+    """
+
+    def __init__(self, graph=None, query: Optional[str] = None,
+                 ticker: str = settings.DEFAULT_TICKER, thresholds: Optional[Dict[str, Any]] = None,
+                 on_report: Optional[Callable[[str, List[str]], None]] = None):
+        self._graph = graph
+        self.query = query or default_query(ticker)
+        self.ticker = ticker
+        # 감시하는 티커와 보고서를 만드는 질문의 티커가 다르면, 엉뚱한 자산의 변화로 보고서를 재생성하게 됩니다.
+        query_tickers = extract_tickers(self.query) or [settings.DEFAULT_TICKER]
+        if query is not None and ticker not in query_tickers:
+            raise ValueError(f"질문({self.query})의 티커 {query_tickers}와 감시 티커({ticker})가 다릅니다.")
+        self.thresholds = thresholds
+        self.on_report = on_report or (lambda report, reasons: print(report))
+
+        self.last_report: Optional[str] = None
+        self.last_snapshot: Optional[Dict[str, Any]] = None # 마지막으로 *전체 보고서를 생성한* 시점의 스냅샷
+        self.stats = {"ticks": 0, "regenerated": 0, "reissued": 0, "errors": 0}
+
+    @property
+    def graph(self):
+        if self._graph is None:
+            from .graph import app
+            self._graph = app
+        return self._graph
+
+    def take_snapshot(self) -> Dict[str, Any]:
+        """LLM 없이 기술적 지표만 갱신합니다."""
+        return calculate_technical_indicators.invoke({
+            "ticker": self.ticker,
+            "period": settings.DEFAULT_MARKET_DATA_PERIOD,
+        })
+
+    def tick(self) -> Optional[str]:
+        """스케줄러의 1회 실행. 발행한 보고서를 반환합니다. (지표 갱신 실패 시 None)"""
+        self.stats["ticks"] += 1
+        snapshot = self.take_snapshot()
+        if "error" in snapshot:
+            print(f"경고: 지표 갱신 실패로 이번 주기를 건너뜁니다. ({snapshot['error']})")
+            return None
+
+        if self.last_report is None:
+            reasons = ["최초 보고서 생성"]
+        else:
+            reasons = detect_material_changes(self.last_snapshot, snapshot, self.thresholds)
+
+        if reasons:
+            final_state = self.graph.invoke({"query": self.query, "messages": []})
+            report = final_state.get("final_report")
+            if not report:
+                print("경고: 최종 분석 보고서를 생성하지 못했습니다.")
+                return None
+            self.last_report, self.last_snapshot = report, snapshot
+            self.stats["regenerated"] += 1
+        else:
+            report = refresh_report(self.last_report, snapshot)
+            self.stats["reissued"] += 1
+
+        self.on_report(report, reasons)
+        return report
+
+    def run_forever(self, interval_seconds: int = settings.SCHEDULER_INTERVAL_SECONDS):
+        """
+        interval_seconds 주기로 tick()을 반복 실행합니다. (Ctrl+C로 종료)
+        한 주기의 실패(OpenAI/네트워크 오류 등)는 기록만 하고 계속 실행합니다.
+        (실패한 주기에는 last_snapshot이 갱신되지 않으므로, 다음 주기에 같은 변화로 다시 시도합니다.)
+        """
+        try:
+            while True:
+                started = time.monotonic()
+                try:
+                    self.tick()
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    print(f"경고: 이번 주기 실행 중 오류가 발생했습니다. 다음 주기에 다시 시도합니다. ({type(e).__name__}: {e})")
+                time.sleep(max(0.0, interval_seconds - (time.monotonic() - started)))
+        except KeyboardInterrupt:
+            print(f"\n스케줄러를 종료합니다. {self.stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="변화가 감지될 때만 비트코인 보고서를 재생성하는 스케줄러")
+    parser.add_argument("--query", help="보고서 생성 질문 (기본값: --ticker로부터 생성)")
+    parser.add_argument("--ticker", default=settings.DEFAULT_TICKER)
+    parser.add_argument("--interval", type=int, default=settings.SCHEDULER_INTERVAL_SECONDS, help="갱신 주기(초)")
+    parser.add_argument("--price-change-pct", type=float, default=settings.SCHEDULER_THRESHOLDS["price_change_pct"])
+    args = parser.parse_args()
+
+    def print_report(report: str, reasons: List[str]):
+        print("=" * 40)
+        print(f"[재생성] 사유: {', '.join(reasons)}" if reasons else "[재발행] 변화 없음")
+        print("=" * 40)
+        print(report)
+
+    try:
+        scheduler = ReportScheduler(
+            query=args.query,
+            ticker=args.ticker,
+            thresholds={"price_change_pct": args.price_change_pct},
+            on_report=print_report,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    scheduler.run_forever(args.interval)
+
+
+if __name__ == "__main__":
+    # 실행 예: python -m src.bitcoin_agent.scheduler --interval 900
+    main()
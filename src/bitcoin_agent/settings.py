@@ -11,6 +11,8 @@ load_dotenv(BASE_DIR / ".env")
 # (이 파일 자체에 키를 하드코딩하지 않습니다-매우 중요함.)
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
+# (선택) OpenAI 호환 엔드포인트 주소. None이면 OpenAI 기본 엔드포인트를 사용합니다. (예: 부하 테스트용 mock 서버)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
 
 # --- 2. LLM 모델 설정 ---
 # (모델을 쉽게 교체할 수 있도록 중앙 관리)
@@ -29,4 +31,86 @@ REFLECTION_PROMPT_PATH = PROMPTS_DIR / "reflection.md"
 # --- 4. 기타 설정 ---
 DEFAULT_TICKER = "BTC-USD"
 DEFAULT_MARKET_DATA_PERIOD = "1y" # TA 계산을 위해 충분한 기간
-DEFAULT_SEARCH_PERIOD = "1mo" # 뉴스는 최근 1달간
\ No newline at end of file
+DEFAULT_SEARCH_PERIOD = "1mo" # 뉴스는 최근 1달간
+
+# --- 5. 뉴스 처리(중복 제거 / 정서 점수) 설정 ---
+# (google_search 결과를 State에 저장하기 전에 로컬에서 처리합니다. LLM 호출 없음.)
+NEWS_SIMHASH_MAX_DISTANCE = 10 # 64비트 SimHash 해밍 거리가 이 값 이하이면 같은 기사로 간주
+NEWS_SENTIMENT_NEUTRAL_BAND = 0.15 # |점수| < 이 값이면 '중립'
+NEWS_TOP_HEADLINES = 3 # 요약에 포함할 대표 헤드라인 개수
+
+# --- 6. 다중 티커 비교 분석 설정 ---
+# 질문에서 티커를 찾기 위한 별칭
+# (영문은 단어 단위, 한글은 앞에 다른 음절이 붙지 않고 뒤에는 조사만 올 수 있는 단어 단위로 매칭. 예: '리플'은 '트리플', '리플레이'에 매칭되지 않음)
+TICKER_ALIASES = {
+    "BTC-USD": ("btc", "bitcoin", "비트코인"),
+    "ETH-USD": ("eth", "ethereum", "ether", "이더리움"),
+    "SOL-USD": ("sol", "solana", "솔라나"),
+    "XRP-USD": ("xrp", "ripple", "리플"),
+    "DOGE-USD": ("doge", "dogecoin", "도지코인"),
+    "ADA-USD": ("ada", "cardano", "카르다노"),
+}
+COMPARISON_PRICE_PERIOD = "30d" # 티커별 가격 변화율 요약에 사용할 기간
+
+# --- 7. 리포트 캐시 설정 ---
+# 같은 의도(티커/기간/초점)의 질문에는, 시장 스냅샷이 이 시간(초) 이내라면 캐시된 final_report를 재사용합니다.
+REPORT_CACHE_TTL_SECONDS = int(os.getenv("REPORT_CACHE_TTL_SECONDS", "300"))
+REPORT_CACHE_MAX_ENTRIES = 128
+
+# 질문 의도 분류용 키워드 (intent.classify_intent)
+HORIZON_KEYWORDS = {
+    "short": ("단기", "오늘", "이번 주", "최근", "24시간", "일주일", "short-term", "today", "this week"),
+    "long": ("장기", "1년", "올해", "연간", "long-term", "this year"),
+}
+FOCUS_KEYWORDS = {
+    "technical": ("rsi", "macd", "이동평균", "ema", "지표", "차트", "기술적"),
+    "news": ("뉴스", "규제", "정서", "심리", "이슈", "news", "sentiment", "regulation"),
+}
+# 의도 분류에 영향을 주지 않는 추세 표현 / 불용어.
+# 티커, 위 키워드, 이 목록을 모두 제거한 뒤에도 남는 단어가 있으면 (예: "채굴 난이도")
+# 분류를 확신할 수 없는 질문으로 보고 리포트 캐시를 사용하지 않습니다.
+INTENT_FILLER_WORDS = (
+    "트렌드", "추세", "흐름", "동향", "전망", "시세", "가격", "시장", "분석", "비교", "요즘", "지금", "현재",
+    "어때", "어떤가", "요약", "정리", "어떻게", "알려", "해줘", "해 줘", "해주세요", "줘", "주세요", "좀", "대비",
+    "trend", "trends", "analysis", "analyze", "outlook", "price", "market", "compare", "comparison",
+    "recent", "latest", "summary", "vs", "versus", "and", "the", "of", "for", "how", "is", "what", "please",
+)
+INTENT_PARTICLES = (
+    "은", "는", "이", "가", "을", "를", "의", "에", "와", "과", "도", "랑", "로", "으로", "에서", "하고", "이랑", "요",
+    "만", "보다", "까지", "부터",
+)
+
+# --- 8. 변화 감지 스케줄러 설정 ---
+# 주기적으로 지표만 (LLM 없이) 갱신하고, 아래 임계값 중 하나라도 넘을 때만 전체 그래프를 실행합니다.
+SCHEDULER_INTERVAL_SECONDS = int(os.getenv("SCHEDULER_INTERVAL_SECONDS", "900"))
+SCHEDULER_DEFAULT_QUERY = "최근 비트코인 트렌드 분석해줘"
+SCHEDULER_THRESHOLDS = {
+    "price_change_pct": 3.0, # 마지막 보고 시점 대비 종가 변화율(%) 절댓값
+    "rsi_bands": (30, 70), # RSI 과매도/과매수 경계 (구간이 바뀌면 변화로 간주)
+    "macd_histogram_flip": True, # MACD 히스토그램 부호 전환
+    "ema_cross": True, # EMA-50 / EMA-200 골든/데드 크로스
+}
+
+# --- 9. Record / Replay 카세트 설정 ---
+# CASSETTE_MODE: "record" (실제 호출 + 기록) | "replay" (기록된 응답 재생) | 미설정 (사용 안 함)
+CASSETTE_MODE = os.getenv("CASSETTE_MODE")
+CASSETTE_PATH = Path(os.getenv("CASSETTE_PATH", BASE_DIR / "cassettes" / "default.json"))
+CASSETTE_STRICT = os.getenv("CASSETTE_STRICT", "0") == "1" # replay 시 기록에 없는 요청이면 실패
+
+# --- 10. 프롬프트 인코딩 설정 (analysis 입력) ---
+# 섹션별 최대 토큰 수. 초과 시 뒤쪽 줄부터 잘라냅니다.
+PROMPT_SECTION_TOKEN_BUDGETS = {
+    "technical": 400,
+    "market": 300,
+    "sentiment": 300,
+    "draft": 2000,
+    "reflection": 600,
+}
+# 수정 라운드에서 섹션 단어 중 이 비율 이상이 비평에도 등장하면 '수정 대상 섹션'으로 봅니다.
+REVISION_SECTION_OVERLAP = 0.2
+
+# --- 11. 파이프라인(투기적) 비평 모드 ---
+# 활성화하면 analysis 초안이 스트리밍되는 동안 완성된 섹션부터 reflection이 병렬로 비평합니다.
+# 섹션 비평에 차단 이슈가 없으면 planner는 추가 비평 라운드 없이 초안을 최종 승인합니다.
+PIPELINED_REFLECTION = os.getenv("PIPELINED_REFLECTION", "0") == "1"
+PIPELINED_REFLECTION_WORKERS = 4 # 섹션 비평을 동시에 실행할 최대 스레드 수
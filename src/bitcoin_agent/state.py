@@ -20,6 +20,9 @@ class AgentState(TypedDict):
     plan: Optional[List[str]]
     """planner_agent가 수립한 단계별 분석 계획 리스트"""
     
+    tickers: Optional[List[str]]
+    """(비교 분석 모드) 질문에서 추출한 비교 대상 티커 리스트 (예: ['BTC-USD', 'ETH-USD'])"""
+    
     
     # --- 2. 데이터 수집 단계 ---
     
@@ -30,7 +33,10 @@ class AgentState(TypedDict):
     """`calculate_technical_indicators` Tool이 계산한 기술적 지표 (RSI, MA, MACD 등)"""
     
     sentiment_analysis: Optional[Dict[str, Any]]
-    """`Google Search` Tool이 수집한 뉴스/소셜 데이터 및 정서 분석 요약"""
+    """`Google Search` Tool이 수집한 뉴스를 `news_processing.summarize_news()`로 중복 제거/점수화한 정서 요약"""
+    
+    comparative_results: Annotated[List[Dict[str, Any]], operator.add]
+    """(비교 분석 모드) 병렬 실행된 `ticker_worker`들의 티커별 결과. (operator.add로 누적)"""
     
 
     # --- 3. 분석 및 검토 단계 (Reflection Cycle) ---
@@ -41,6 +47,15 @@ class AgentState(TypedDict):
     reflection: Optional[str]
     """`reflection_node`가 1차 초안을 비평한 내용 (수정 지시사항)"""
     
+    reflection_blocking: Optional[bool]
+    """(파이프라인 비평 모드) 섹션 단위 비평 중 수정이 필요한 섹션이 있는지. (False면 planner가 추가 비평 라운드 없이 초안을 승인)"""
+    
+    section_critiques: Optional[Dict[str, str]]
+    """(파이프라인 비평 모드) 섹션 본문 해시 -> 섹션 비평. (다음 라운드에서 바뀌지 않은 섹션의 비평을 재사용)"""
+    
+    analysis_prompt_tokens: Optional[Dict[str, int]]
+    """마지막 `analysis_node` 호출 프롬프트의 섹션별 토큰 수 (예: {'technical': 40, 'sentiment': 95, ...})"""
+    
     
     # --- 4. 최종 결과 ---
     
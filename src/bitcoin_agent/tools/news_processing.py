@@ -0,0 +1,197 @@
+import re
+import hashlib
+from typing import List, Dict, Any, Optional
+
+from .. import settings
+
+# [참고] 이 모듈은 LLM이 호출하는 @tool이 아닙니다.
+# `google_search`가 반환한 원본 검색 결과를 State에 저장하기 *전에*
+# 로컬(오프라인)에서 처리하는 전처리 단계입니다.
+#   1. SimHash로 거의 동일한 기사(같은 통신사 기사를 여러 매체가 전재한 경우)를 묶고,
+#   2. 한/영 감성 사전(lexicon)으로 기사별 정서 점수를 매긴 뒤,
+#   3. 대표 헤드라인과 함께 간결한 정서 요약(dict)으로 집계합니다.
+# 이를 통해 analysis 프롬프트가 짧아지고, planner는 추가 LLM 호출 없이 수치 신호를 얻습니다.
+
+
+# --- 1. 감성 사전 (Lexicon) ---
+# 영어는 단어(토큰) 단위로, 한국어는 교착어 특성상 부분 문자열 단위로 매칭합니다.
+POSITIVE_EN = {
+    "surge", "surges", "surged", "rally", "rallies", "rallied", "gain", "gains", "bullish",
+    "rise", "rises", "rising", "soar", "soars", "soared", "jump", "jumps", "jumped",
+    "rebound", "rebounds", "breakout", "record", "high", "highs", "approval", "approved",
+    "approve", "adoption", "inflow", "inflows", "optimism", "optimistic", "recovery", "upgrade",
+}
+NEGATIVE_EN = {
+    "crash", "crashes", "crashed", "plunge", "plunges", "plunged", "drop", "drops", "dropped",
+    "fall", "falls", "fell", "bearish", "decline", "declines", "declined", "selloff", "sell-off",
+    "hack", "hacked", "ban", "banned", "lawsuit", "sued", "outflow", "outflows", "fear", "fears",
+    "liquidation", "liquidations", "loss", "losses", "slump", "tumble", "tumbles", "fraud", "crackdown",
+}
+POSITIVE_KO = (
+    "상승", "급등", "호재", "강세", "반등", "최고치", "신고가", "승인", "유입", "돌파",
+    "매수세", "낙관", "회복", "상향",
+)
+NEGATIVE_KO = (
+    "하락", "급락", "폭락", "악재", "약세", "규제", "해킹", "유출", "소송", "청산",
+    "매도세", "우려", "공포", "비관", "불안", "하향", "사기",
+)
+NEGATIONS_EN = {
+    "not", "no", "never", "without", "cannot", "isn't", "aren't", "wasn't", "won't",
+    "don't", "doesn't", "didn't", "can't", "unlikely",
+}
+NEGATION_WINDOW = 3 # 부정어가 극성을 뒤집는 범위 (직전 토큰 수)
+
+# 단어 토큰과 절(clause) 경계 구두점을 함께 토큰화합니다. (부정어의 범위는 절 경계를 넘지 않음)
+_TOKEN_RE = re.compile(r"[a-z][a-z\-']*|[,.;:!?]")
+_CLAUSE_BREAKS = {",", ".", ";", ":", "!", "?"}
+
+
+def score_text(text: str) -> Dict[str, Any]:
+    """
+    사전 기반으로 한 텍스트의 정서 점수를 계산합니다.
+
+    Returns:
+        Dict[str, Any]: {'score': -1.0 ~ 1.0, 'positive': 긍정 단어 수, 'negative': 부정 단어 수}
+    """
+    positive, negative = 0, 0
+
+    # 1. 영어: 토큰 단위 매칭 (같은 절 안의 직전 NEGATION_WINDOW개 토큰에 부정어가 있으면 극성 반전)
+    #    예: "not expected to crash" -> 긍정, "not bad, but prices crashed" -> 부정
+    tokens = _TOKEN_RE.findall(text.lower().replace("\u2019", "'"))
+    for i, token in enumerate(tokens):
+        polarity = 1 if token in POSITIVE_EN else -1 if token in NEGATIVE_EN else 0
+        if polarity == 0:
+            continue
+        window = []
+        for previous in reversed(tokens[max(0, i - NEGATION_WINDOW):i]):
+            if previous in _CLAUSE_BREAKS:
+                break
+            window.append(previous)
+        if NEGATIONS_EN.intersection(window):
+            polarity = -polarity
+        if polarity > 0:
+            positive += 1
+        else:
+            negative += 1
+
+    # 2. 한국어: 부분 문자열 매칭
+    positive += sum(text.count(word) for word in POSITIVE_KO)
+    negative += sum(text.count(word) for word in NEGATIVE_KO)
+
+    total = positive + negative
+    score = (positive - negative) / total if total else 0.0
+    return {"score": round(score, 2), "positive": positive, "negative": negative}
+
+
+# --- 2. 중복 기사 제거 (SimHash) ---
+
+def _normalize(text: str) -> str:
+    """구두점/공백 차이를 무시하도록 텍스트를 정규화합니다."""
+    return re.sub(r"[\W_]+", "", text.lower())
+
+
+def simhash(text: str, n: int = 3) -> int:
+    """
+    문자 n-gram 기반 64비트 SimHash를 계산합니다.
+    (문자 단위이므로 띄어쓰기가 불규칙한 한국어 기사에도 동작합니다.)
+    """
+    normalized = _normalize(text)
+    if len(normalized) < n:
+        normalized = normalized.ljust(n)
+
+    weights = [0] * 64
+    for i in range(len(normalized) - n + 1):
+        digest = hashlib.blake2b(normalized[i:i + n].encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "big")
+        for bit in range(64):
+            weights[bit] += 1 if (value >> bit) & 1 else -1
+
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def dedupe_articles(articles: List[Dict[str, Any]], max_distance: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    SimHash 해밍 거리로 거의 동일한 기사를 묶습니다.
+    각 묶음(cluster)의 첫 기사를 대표로 남기고, 'duplicates'에 묶인 기사 수(대표 포함)를 기록합니다.
+    """
+    if max_distance is None:
+        max_distance = settings.NEWS_SIMHASH_MAX_DISTANCE
+
+    clusters: List[Dict[str, Any]] = []
+    for article in articles:
+        fingerprint = simhash(f"{article.get('title', '')} {article.get('content', '')}")
+        for cluster in clusters:
+            if hamming_distance(cluster["_simhash"], fingerprint) <= max_distance:
+                cluster["duplicates"] += 1
+                break
+        else:
+            clusters.append({**article, "duplicates": 1, "_simhash": fingerprint})
+
+    for cluster in clusters:
+        del cluster["_simhash"]
+    return clusters
+
+
+# --- 3. 집계 ---
+
+def _label(score: float) -> str:
+    if score >= settings.NEWS_SENTIMENT_NEUTRAL_BAND:
+        return "긍정"
+    if score <= -settings.NEWS_SENTIMENT_NEUTRAL_BAND:
+        return "부정"
+    return "중립"
+
+
+def summarize_news(results: List[Dict[str, Any]], top_n: Optional[int] = None) -> Dict[str, Any]:
+    """
+    `google_search` 결과 리스트를 중복 제거 + 정서 점수화하여 간결한 요약으로 집계합니다.
+
+    Args:
+        results (List[Dict[str, Any]]): `google_search`의 반환값 ({'title', 'url', 'content'} 리스트)
+        top_n (int): 요약에 포함할 대표 헤드라인 수. (기본값: settings.NEWS_TOP_HEADLINES)
+
+    Returns:
+        Dict[str, Any]:
+        {'score': 0.25, 'label': '긍정', 'article_count': 8, 'unique_count': 5,
+         'positive': 3, 'negative': 1, 'neutral': 1,
+         'top_headlines': [{'title': ..., 'url': ..., 'score': 0.5, 'duplicates': 2}, ...]}
+    """
+    if top_n is None:
+        top_n = settings.NEWS_TOP_HEADLINES
+
+    # 'title'이 없는 항목은 "검색 결과 없음" 같은 안내 메시지이므로 제외합니다.
+    articles = [r for r in results if isinstance(r, dict) and r.get("title") and "error" not in r]
+    unique_articles = dedupe_articles(articles)
+
+    counts = {"긍정": 0, "부정": 0, "중립": 0}
+    weighted_sum, total_weight = 0.0, 0
+    for article in unique_articles:
+        article.update(score_text(f"{article.get('title', '')} {article.get('content', '')}"))
+        counts[_label(article["score"])] += 1
+        # 여러 매체가 다룬 기사일수록 시장 영향이 크다고 보고 묶음 크기로 가중합니다.
+        weighted_sum += article["score"] * article["duplicates"]
+        total_weight += article["duplicates"]
+
+    score = round(weighted_sum / total_weight, 2) if total_weight else 0.0
+
+    # 대표 헤드라인: 많이 보도되고, 정서가 뚜렷한 기사 순
+    representative = sorted(unique_articles, key=lambda a: (a["duplicates"], abs(a["score"])), reverse=True)
+    top_headlines = [
+        {"title": a["title"], "url": a.get("url", "#"), "score": a["score"], "duplicates": a["duplicates"]}
+        for a in representative[:top_n]
+    ]
+
+    return {
+        "score": score,
+        "label": _label(score),
+        "article_count": len(articles),
+        "unique_count": len(unique_articles),
+        "positive": counts["긍정"],
+        "negative": counts["부정"],
+        "neutral": counts["중립"],
+        "top_headlines": top_headlines,
+    }
@@ -1,5 +1,4 @@
 import pandas as pd
-import pandas_ta as ta
 from langchain_core.tools import tool
 from typing import Dict, Any
 import yfinance as yf
@@ -22,6 +21,10 @@ def calculate_technical_indicators(ticker: str = "BTC-USD", period: str = "1y")
         실패 시: {'error': '...에러 메시지...'}
     """
     try:
+        # [수정] pandas-ta는 지표 계산 시점에 import합니다. (DataFrame.ta 접근자 등록)
+        #        미설치 환경에서도 이 모듈을 import하는 스케줄러/카세트/그래프는 로드되며, 이 도구만 오류를 반환합니다.
+        import pandas_ta  # noqa: F401
+
         # 1. yfinance 로직
         data = yf.Ticker(ticker)
         hist_df = data.history(period=period, interval="1d")
@@ -0,0 +1,309 @@
+import json
+import time
+import pytest
+
+from langchain_core.messages import AIMessage, ToolMessage
+
+from src.bitcoin_agent.intent import classify_intent, extract_tickers, intent_key
+from src.bitcoin_agent.report_cache import ReportCache
+from src.bitcoin_agent.prompt_encoding import (
+    apply_section_edits, build_revision_request, count_tokens, render_kv, truncate_to_budget,
+)
+
+
+# --- intent / report_cache: 의도 분류와 캐시 키 ---
+
+def test_extract_tickers_korean_aliases_allow_particles_only():
+    assert extract_tickers("비트코인과 리플 비교") == ["BTC-USD", "XRP-USD"]
+    assert extract_tickers("이더리움보다 솔라나") == ["ETH-USD", "SOL-USD"]
+    # '리플'이 다른 단어의 일부인 경우는 티커가 아닙니다.
+    assert extract_tickers("리플레이 비트코인") == ["BTC-USD"]
+    assert extract_tickers("비트코인 트리플 탑 패턴") == ["BTC-USD"]
+
+
+def test_paraphrases_share_intent_key():
+    a = classify_intent("최근 비트코인 트렌드 분석해줘")
+    b = classify_intent("요즘 비트코인 최근 흐름 어때?")
+    assert a["confident"] and b["confident"]
+    assert intent_key(a) == intent_key(b) == "BTC-USD|short|general"
+
+
+def test_ascii_keywords_match_on_word_boundaries():
+    assert classify_intent("Bitcoin RSI analysis")["focus"] == "technical"
+    assert classify_intent("bitcoin conversion")["focus"] == "general"
+
+
+def test_unrelated_query_is_not_confident():
+    assert not classify_intent("비트코인 채굴 난이도")["confident"]
+
+
+class _CountingGraph:
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, state):
+        self.calls += 1
+        return {"final_report": f"report #{self.calls}: {state['query']}"}
+
+
+def test_report_cache_bypasses_unconfident_queries():
+    graph = _CountingGraph()
+    cache = ReportCache(graph=graph, ttl_seconds=300)
+
+    first = cache.get_report("최근 비트코인 트렌드")
+    assert cache.get_report("요즘 비트코인 최근 흐름 어때?") == first
+    assert cache.get_report("비트코인 채굴 난이도") != first
+    assert graph.calls == 2
+    assert cache.stats == {"hits": 1, "misses": 1, "coalesced": 0, "bypassed": 1}
+
+
+# --- prompt_encoding / analysis: 섹션 단위 수정 ---
+
+DRAFT = (
+    "## 요약\n비트코인은 중기 상승 추세입니다.\n\n"
+    "## 기술적 분석\nRSI는 중립 구간이며 MACD 히스토그램은 양수입니다.\n\n"
+    "## 시장 정서\n뉴스 정서는 전반적으로 긍정적입니다."
+)
+SECTIONS = ["## 요약\nA", "## 기술적 분석\nB", "## 시장 정서\nC"]
+
+
+def test_build_revision_request_targets_mentioned_section():
+    text, sections = build_revision_request(DRAFT, "'기술적 분석' 섹션에 RSI 수치를 명시할 것.")
+    assert len(sections) == 3
+    assert "[S2] (수정 대상)\n## 기술적 분석" in text
+    assert "[S1] ## 요약" in text and "중기 상승 추세" not in text
+
+
+def test_apply_section_edits_accepts_marker_variants():
+    expected = "## 요약\nA\n\n## 기술적 분석\nB2\n\n## 시장 정서\nC"
+    assert apply_section_edits(SECTIONS, "[S2]\n## 기술적 분석\nB2") == expected
+    assert apply_section_edits(SECTIONS, "[S2] ## 기술적 분석\nB2") == expected
+    assert apply_section_edits(SECTIONS, "**[S2]** (수정 대상)\n## 기술적 분석\nB2") == expected
+    # 목차 줄만 되풀이한 섹션은 그대로 유지합니다.
+    assert apply_section_edits(SECTIONS, "[S1] ## 요약\n[S2]\n## 기술적 분석\nB2") == expected
+    assert apply_section_edits(SECTIONS, "표시 없는 응답") is None
+
+
+def test_truncate_to_budget_cuts_inside_a_long_line():
+    line = render_kv({f"k{i}": i * 1.2345 for i in range(400)})
+    truncated = truncate_to_budget(line, 50)
+    assert count_tokens(truncated) <= 50
+    assert truncated.startswith("k0=0 k1=1.23") and truncated.endswith("...(생략)")
+
+
+class _ScriptedChain:
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.tasks = []
+
+    def invoke(self, inputs):
+        self.tasks.append(inputs["task"])
+        return AIMessage(content=self.replies.pop(0))
+
+
+def test_analysis_retries_with_full_draft_when_markers_are_missing(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    from src.bitcoin_agent.agents import analysis
+
+    chain = _ScriptedChain("## 기술적 분석\nRSI 55 (표시 없는 부분 응답)", "전체 수정본")
+    monkeypatch.setattr(analysis, "analysis_chain", chain)
+    state = {"query": "q", "messages": [], "draft_analysis": DRAFT,
+             "reflection": "'기술적 분석' 섹션에 RSI 수치를 명시할 것."}
+
+    result = analysis.analysis_agent(state)
+    assert result["draft_analysis"] == "전체 수정본"
+    assert "(섹션 단위)" in chain.tasks[0]
+    assert "--- [기존 초안] ---" in chain.tasks[1] and "뉴스 정서는 전반적으로 긍정적입니다." in chain.tasks[1]
+
+
+# --- pipeline: 투기적 섹션 비평 ---
+
+class _StreamingChain:
+    def __init__(self, *chunks):
+        self.chunks = chunks
+
+    def stream(self, inputs):
+        for chunk in self.chunks:
+            yield AIMessage(content=chunk)
+
+
+def test_pipelined_analysis_does_not_wait_for_stale_critiques(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    from src.bitcoin_agent.agents import analysis, pipeline, reflection
+
+    # 제목이 나오기 전에는 문단 단위로 나뉘므로 'intro one'은 최종 초안에 없는(stale) 섹션입니다.
+    monkeypatch.setattr(analysis, "analysis_chain", _StreamingChain("intro one\n\n", "intro two\n\n", "## 본문\n내용"))
+
+    def critique(section):
+        if section == "intro one":
+            time.sleep(1.5)
+        return "RSI 수치를 명시할 것." if section.startswith("## 본문") else "이상 없음"
+
+    monkeypatch.setattr(reflection, "critique_section", critique)
+
+    started = time.perf_counter()
+    result = pipeline.pipelined_analysis_agent({"query": "q", "messages": []})
+    assert time.perf_counter() - started < 1.0
+    assert result["draft_analysis"] == "intro one\n\nintro two\n\n## 본문\n내용"
+    assert result["reflection_blocking"] is True
+    assert result["reflection"] == "[S2] '본문' 섹션\nRSI 수치를 명시할 것."
+
+
+# --- graph: mock OpenAI 서버로 모드별 전체 실행 (기본 / 비교 분석 / 파이프라인 비평) ---
+
+@pytest.fixture
+def mock_backends(monkeypatch):
+    """mock LLM 서버와 스텁 yfinance/SerpAPI로 교체하고, 테스트가 끝나면 원래대로 되돌립니다."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("SERPAPI_API_KEY", "test")
+    from src.bitcoin_agent import settings
+    from src.bitcoin_agent.loadtest import install_stubs
+    from src.bitcoin_agent.mock_openai_server import MockOpenAIServer
+    from src.bitcoin_agent.tools import market_data, technical_analysis, search
+    from src.bitcoin_agent.agents import planner, analysis, reflection
+
+    # install_stubs()가 덮어쓰는 속성들을 monkeypatch에 등록해 두면, 테스트 후 자동으로 복원됩니다.
+    for target, name in [(settings, "OPENAI_BASE_URL"), (market_data, "yf"), (technical_analysis, "yf"),
+                         (search, "GoogleSearch"), (planner, "planner_chain"), (analysis, "analysis_chain"),
+                         (reflection, "reflection_chain"), (reflection, "section_reflection_chain")]:
+        monkeypatch.setattr(target, name, getattr(target, name))
+
+    with MockOpenAIServer(latency="0") as server:
+        install_stubs(server.base_url)
+        yield server
+
+
+def _has_pandas_ta():
+    try:
+        import pandas_ta  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _run(query, pipelined=False):
+    from src.bitcoin_agent.graph import create_graph
+    return create_graph(pipelined=pipelined).invoke({"query": query, "messages": []})
+
+
+def test_graph_default_mode(mock_backends):
+    final_state = _run("최근 비트코인 트렌드 분석해줘")
+    assert final_state["final_report"].startswith("[최종 보고서]")
+    assert final_state["sentiment_analysis"]["unique_count"] == 2
+    if _has_pandas_ta(): # (미설치 시 지표 도구는 오류를 반환하고, analysis는 원본 시장 데이터로 대체합니다.)
+        assert final_state["technical_analysis"]["rsi_14"] is not None
+    assert final_state["reflection"].startswith("매우 훌륭함")
+
+
+def test_graph_comparison_mode(mock_backends):
+    final_state = _run("BTC vs ETH vs SOL 추세 비교")
+    assert final_state["tickers"] == ["BTC-USD", "ETH-USD", "SOL-USD"]
+    assert set(final_state["technical_analysis"]) == {"BTC-USD", "ETH-USD", "SOL-USD"}
+    assert len(final_state["comparative_results"]) == 3
+    assert final_state["final_report"].startswith("[최종 보고서]")
+    if _has_pandas_ta():
+        assert all(values["rsi_14"] is not None for values in final_state["technical_analysis"].values())
+
+
+def test_graph_pipelined_mode(mock_backends):
+    from src.bitcoin_agent.graph import create_graph
+    from src.bitcoin_agent.prompt_cache_metrics import PrefixCacheTracker
+
+    tracker = PrefixCacheTracker()
+    final_state = create_graph(pipelined=True).invoke(
+        {"query": "최근 비트코인 트렌드 분석해줘", "messages": []}, config={"callbacks": [tracker]})
+    # 스트리밍된 analysis 호출에도 usage가 포함되어야 합니다. (stream_usage)
+    assert tracker.summary()["analysis"]["prompt_tokens"] > 0
+    assert final_state["reflection_blocking"] is False
+    assert final_state["final_report"] == final_state["draft_analysis"]
+    assert len(final_state["section_critiques"]) == 3
+    assert not any("[Reflection Node] 다음 초안에 대한 비평을" in str(m.content) for m in final_state["messages"])
+
+
+def test_pipelined_analysis_handles_empty_draft(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    from src.bitcoin_agent.agents import analysis, pipeline, reflection
+
+    # mock 서버의 기본 규칙({"content": ""})이나 필터링된 응답처럼 빈 초안이 스트리밍되는 경우
+    monkeypatch.setattr(analysis, "analysis_chain", _StreamingChain(""))
+    monkeypatch.setattr(reflection, "critique_section", lambda section: "초안이 비어 있습니다. 다시 작성할 것.")
+
+    result = pipeline.pipelined_analysis_agent({"query": "q", "messages": []})
+    assert result["draft_analysis"] == ""
+    assert result["reflection_blocking"] is True
+    assert result["reflection"] == "[S1] '' 섹션\n초안이 비어 있습니다. 다시 작성할 것."
+
+
+# --- planner: 비교 분석 모드에서 정서 요약 보존 ---
+
+def test_planner_keeps_comparison_sentiment_after_search(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    from src.bitcoin_agent.agents import planner
+
+    class _Chain:
+        def invoke(self, inputs):
+            return AIMessage(content="데이터 수집 완료.")
+
+    monkeypatch.setattr(planner, "planner_chain", _Chain())
+    comparison_sentiment = {"score": 0.3, "label": "긍정", "unique_count": 4, "top_headlines": []}
+    search_result = [{"title": "Bitcoin plunges after hack", "url": "#", "content": "Bitcoin crashed."}]
+    state = {
+        "query": "BTC vs ETH 추세 비교", "tickers": ["BTC-USD", "ETH-USD"],
+        "technical_analysis": {"BTC-USD": {"rsi_14": 50}, "ETH-USD": {"rsi_14": 60}},
+        "sentiment_analysis": comparison_sentiment,
+        "messages": [AIMessage(content=""), ToolMessage(content=json.dumps(search_result), name="google_search", tool_call_id="1")],
+    }
+
+    assert "sentiment_analysis" not in planner.planner_agent(state)
+
+    # (단일 티커 모드에서는 기존처럼 새 검색 결과로 갱신합니다.)
+    single = {**state, "tickers": None, "technical_analysis": {"rsi_14": 50}}
+    assert planner.planner_agent(single)["sentiment_analysis"]["label"] == "부정"
+
+
+def test_planner_sends_critique_only_once(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    from src.bitcoin_agent.agents import planner
+
+    captured = {}
+
+    class _Chain:
+        def invoke(self, inputs):
+            captured.update(inputs)
+            return AIMessage(content="[최종 보고서] ...")
+
+    monkeypatch.setattr(planner, "planner_chain", _Chain())
+    critique = "RSI 해석 근거가 부족함. 보완 필요."
+    state = {
+        "query": "최근 비트코인 트렌드 분석해줘", "technical_analysis": {"rsi_14": 50},
+        "draft_analysis": "## 요약\n...", "reflection": critique, "messages": [],
+    }
+
+    planner.planner_agent(state)
+    prompt = "\n".join(m.content for m in captured["messages"] + captured["volatile"])
+    assert prompt.count(critique) == 1
+    assert "- 비평: 수신 완료" in captured["volatile"][-1].content
+
+
+# --- comparison: 티커 워커의 데이터 수집 ---
+
+def test_ticker_worker_fetches_indicators_and_prices_concurrently(monkeypatch):
+    from src.bitcoin_agent.agents import comparison
+
+    class _SlowTool:
+        def __init__(self, output):
+            self.output = output
+
+        def invoke(self, args):
+            time.sleep(0.3)
+            return self.output
+
+    rows = [{"Close": 100.0, "High": 110.0, "Low": 90.0}, {"Close": 120.0, "High": 125.0, "Low": 95.0}]
+    monkeypatch.setattr(comparison, "calculate_technical_indicators", _SlowTool({"RSI_14": 55.0}))
+    monkeypatch.setattr(comparison, "get_ohlcv_data", _SlowTool({"data": rows}))
+
+    started = time.perf_counter()
+    result = comparison.ticker_worker({"ticker": "ETH-USD"})["comparative_results"][0]
+    assert time.perf_counter() - started < 0.55 # (순차 실행이면 0.6초 이상)
+    assert result["RSI_14"] == 55.0
+    assert result["change_pct_30d"] == 20.0
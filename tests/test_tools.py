@@ -0,0 +1,120 @@
+import pandas as pd
+import pytest
+
+from src.bitcoin_agent.tools.news_processing import score_text, simhash, hamming_distance, dedupe_articles, summarize_news
+from src.bitcoin_agent.cassette import Cassette, CassetteMiss, _serialize_frame, _deserialize_frame
+
+
+# --- news_processing: 감성 사전 / 부정어 처리 ---
+
+def test_score_text_lexicon():
+    assert score_text("Bitcoin surges to record high")["score"] == 1.0
+    assert score_text("Bitcoin plunges after exchange hack")["score"] == -1.0
+    assert score_text("Bitcoin trades sideways")["score"] == 0.0
+
+
+def test_score_text_korean_substring():
+    # 한국어는 조사가 붙어도 부분 문자열로 매칭합니다.
+    result = score_text("비트코인 급등세, 신고가 경신")
+    assert result["positive"] == 2 and result["negative"] == 0
+
+
+def test_score_text_negation_window():
+    # 부정어와 정서 단어 사이에 두 단어가 끼어도 극성이 반전되어야 합니다.
+    assert score_text("Bitcoin not expected to crash")["score"] == 1.0
+    assert score_text("Bitcoin won't see another rally")["score"] == -1.0
+    assert score_text("Bitcoin doesn’t crash")["score"] == 1.0
+
+
+def test_score_text_negation_stops_at_clause():
+    # 부정어의 범위는 쉼표/마침표 같은 절 경계를 넘지 않습니다.
+    assert score_text("No doubt, prices crashed")["score"] == -1.0
+
+
+# --- news_processing: SimHash 중복 제거 ---
+
+def test_simhash_is_stable_across_punctuation_and_close_for_near_duplicates():
+    a = simhash("Bitcoin rallies as ETF inflows hit record")
+    assert a == simhash("bitcoin rallies, as ETF inflows hit record!")
+    assert hamming_distance(a, simhash("Bitcoin rallies as ETF inflows hit record - wire")) <= 10
+    assert hamming_distance(a, simhash("비트코인, 규제 우려에 약세")) > 10
+
+
+def test_dedupe_articles_clusters_reprints():
+    articles = [
+        {"title": "Bitcoin rallies as ETF inflows hit record", "content": "Bitcoin rallied on strong spot ETF inflows."},
+        {"title": "Bitcoin rallies as ETF inflows hit record - wire", "content": "Bitcoin rallied on strong spot ETF inflows."},
+        {"title": "비트코인, 규제 우려에 약세", "content": "미국 규제 당국의 발언 이후 비트코인이 약세를 보였다."},
+    ]
+    unique = dedupe_articles(articles)
+    assert [a["duplicates"] for a in unique] == [2, 1]
+    assert unique[0]["title"] == articles[0]["title"] and "_simhash" not in unique[0]
+
+    summary = summarize_news(articles + [{"content": "검색 결과가 없습니다."}])
+    assert summary["article_count"] == 3 and summary["unique_count"] == 2
+    assert summary["top_headlines"][0]["duplicates"] == 2
+
+
+# --- scheduler: 변화 감지 ---
+
+def test_detect_material_changes():
+    from src.bitcoin_agent.scheduler import detect_material_changes
+
+    base = {"last_close_price": 100.0, "rsi_14": 50.0, "macd_histogram": 1.0, "ema_50": 110.0, "ema_200": 100.0}
+    assert detect_material_changes(base, {**base, "last_close_price": 102.0}) == []
+
+    changed = {"last_close_price": 104.0, "rsi_14": 75.0, "macd_histogram": -0.5, "ema_50": 95.0, "ema_200": 100.0}
+    reasons = detect_material_changes(base, changed)
+    assert len(reasons) == 4
+    assert reasons[1] == "RSI 구간 변경 중립 -> 과매수"
+    assert reasons[2] == "MACD 히스토그램 음전환" and reasons[3] == "EMA-50/200 데드 크로스"
+
+    # 임계값 덮어쓰기
+    assert detect_material_changes(base, {**base, "last_close_price": 102.0}, {"price_change_pct": 1.0})
+
+
+# --- cassette: OHLCV 기록/재생, strict 미스 ---
+
+def _empty_cassette(path):
+    Cassette(path, mode="record").save()
+    return path
+
+
+def test_cassette_ohlcv_frame_round_trip(tmp_path):
+    index = pd.date_range("2024-01-01", periods=3, freq="D", tz="America/New_York", name="Date")
+    frame = pd.DataFrame({"Close": [100.5, float("nan"), 102.25], "Volume": [10, 20, 30]}, index=index)
+    request = {"ticker": "BTC-USD", "period": "3d", "interval": "1d"}
+    path = tmp_path / "ohlcv.json"
+
+    recorder = Cassette(path, mode="record")
+    recorder.call("ohlcv", request, lambda: frame, _serialize_frame, _deserialize_frame)
+    recorder.save()
+
+    def no_network():
+        raise AssertionError("replay 중 실제 호출이 발생했습니다.")
+
+    replayed = Cassette(path, mode="replay", strict=True).call("ohlcv", request, no_network, _serialize_frame, _deserialize_frame)
+    pd.testing.assert_frame_equal(replayed, frame, check_freq=False)
+
+
+def test_cassette_strict_lookup_records_miss(tmp_path):
+    cassette = Cassette(_empty_cassette(tmp_path / "empty.json"), mode="replay", strict=True)
+    with pytest.raises(CassetteMiss):
+        cassette.lookup("search", {"q": "unrecorded"})
+    with pytest.raises(CassetteMiss):
+        cassette.raise_for_misses()
+
+
+def test_cassette_strict_miss_fails_even_if_tool_swallows_it(tmp_path, monkeypatch):
+    from src.bitcoin_agent.cassette import use_cassette
+    from src.bitcoin_agent.tools.market_data import get_ohlcv_data
+    from src.bitcoin_agent.tools.search import google_search
+
+    monkeypatch.setenv("SERPAPI_API_KEY", "test")
+    path = _empty_cassette(tmp_path / "empty.json")
+
+    with pytest.raises(CassetteMiss, match="2건"):
+        with use_cassette(path, mode="replay", strict=True):
+            # 도구는 예외를 잡아 오류 payload를 반환하지만, 블록 종료 시 미스가 드러나야 합니다.
+            assert "error" in get_ohlcv_data.invoke({"ticker": "BTC-USD", "period": "30d"})
+            assert "error" in google_search.invoke({"query": "unrecorded"})[0]